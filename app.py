@@ -7,3 +7,26 @@ st.write('https://github.com/NannyML/nannyml')
 st.write('https://nannyml.readthedocs.io/')
 
 st.write('NannyML is an open-source python library that allows you to estimate post-deployment model performance (without access to targets), detect data drift, and intelligently link data drift alerts back to changes in model performance. Built for data scientists, NannyML has an easy-to-use interface, interactive visualizations, is completely model-agnostic and currently supports all tabular use cases, classification and regression.')
+
+import warmup
+warmup.start()
+
+from data import DATASETS, cache_stats, dtype_report
+with st.expander('Dataset cache'):
+    st.json(cache_stats())
+    for name in sorted(DATASETS):
+        report = dtype_report(name)
+        if len(report):
+            st.write(f'{name}: {report["bytes_saved"].sum() / 1024 / 1024:.1f} MB saved by dtype optimization')
+            st.dataframe(report)
+
+from fitting import cache_stats as fit_cache_stats
+with st.expander('Fit cache'):
+    st.json(fit_cache_stats())
+
+from plots import cache_stats as figure_cache_stats
+with st.expander('Figure cache'):
+    st.json(figure_cache_stats())
+
+with st.expander('Warm-up'):
+    st.json(warmup.status())
@@ -0,0 +1,118 @@
+"""Runs monitoring pipelines from a YAML config file, without Streamlit, e.g. as a nightly job.
+
+Pipelines run in parallel worker processes (see execution.py) and their results are written to the ``output``
+directory in the layout of the results store (see store.py), next to a ``summary.json`` with the chunks and alerts
+of each pipeline. Pipelines whose configuration and data didn't change since the previous run aren't recomputed,
+unless --force is given.
+
+    python batch.py [--force] [--output DIR] [--workers N] config.yaml
+
+Example config:
+
+    output: batch-results
+    workers: 4
+    pipelines:
+      # a pipeline of the pages, see PIPELINES in pipelines.py
+      - cbpe_census_employment
+      # a pipeline of the pages with other estimator arguments
+      - name: dle_car_price
+        kwargs:
+          chunk_size: 3000
+      # a pipeline of the pages run on other data, read from Parquet or CSV files
+      - name: car_loan_drift
+        pipeline: univariate_drift_car_loan
+        reference_path: data/reference.parquet
+        analysis_path: data/analysis.parquet
+        # approximate drift from sketches, for very large chunks (see sketches.py)
+        sketch_bins: 1000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import yaml
+
+import execution
+import store
+from pipelines import PIPELINES, get_results
+
+PATHS = ('reference_path', 'analysis_path', 'analysis_targets_path')
+
+
+def load_config(path):
+    """Returns the config file as ``(output, workers, {name: pipeline})``."""
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+
+    pipelines = {}
+    for entry in config.get('pipelines') or list(PIPELINES):
+        entry = {'name': entry} if isinstance(entry, str) else dict(entry)
+        name = entry.pop('name')
+        base = entry.pop('pipeline', name)
+        if base not in PIPELINES:
+            raise ValueError(f"unknown pipeline '{base}', expected one of {', '.join(PIPELINES)}")
+        pipeline = dict(PIPELINES[base], kwargs=dict(PIPELINES[base]['kwargs'], **entry.pop('kwargs', {})))
+        if any(key in entry for key in PATHS):
+            pipeline.pop('dataset')
+        pipeline.update(entry)
+        pipelines[name] = pipeline
+    return config.get('output', 'batch-results'), config.get('workers'), pipelines
+
+
+def summarize(result, seconds):
+    data = result.data
+    period = next(column for column in data.columns if column[0] == 'chunk' and column[-1] == 'period')
+    analysis = data[data[period] == 'analysis']
+    alerts = analysis[[column for column in data.columns if column[-1] == 'alert']]
+    return {
+        'status': 'ok',
+        'seconds': seconds,
+        'chunks': len(analysis),
+        'alerts': int(alerts.fillna(False).astype(bool).to_numpy().sum()),
+        'chunks_with_alerts': int(alerts.fillna(False).astype(bool).any(axis=1).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('config', help='YAML config file')
+    parser.add_argument('--output', help='directory to write the results to, overrides the config')
+    parser.add_argument('--workers', type=int, help='number of worker processes, overrides the config')
+    parser.add_argument('--force', action='store_true', help='recompute even when stored results are up to date')
+    args = parser.parse_args()
+    try:
+        output, workers, pipelines = load_config(args.config)
+    except (OSError, ValueError, yaml.YAMLError) as exc:
+        parser.error(str(exc))
+
+    # Worker processes read these when they start.
+    os.environ['NML_RESULTS_DIR'] = store.ROOT = os.path.abspath(args.output or output)
+    if args.workers or workers:
+        os.environ['NML_WORKERS'] = str(args.workers or workers)
+
+    if args.force:
+        for name in pipelines:
+            store.remove(name)
+    start = time.perf_counter()
+    jobs = execution.run({name: (get_results, name, pipeline) for name, pipeline in pipelines.items()})
+    execution.shutdown()
+
+    summary = {}
+    for name, job in jobs.items():
+        if job.error is None:
+            summary[name] = summarize(job.value, job.seconds)
+            print(f'{name}: {job.seconds:.2f}s, {summary[name]["chunks_with_alerts"]} of {summary[name]["chunks"]} '
+                  f'analysis chunks with alerts')
+        else:
+            summary[name] = {'status': 'error', 'seconds': job.seconds, 'error': repr(job.error)}
+            print(f'{name}: failed with {job.error!r}', file=sys.stderr)
+    os.makedirs(store.ROOT, exist_ok=True)
+    with open(os.path.join(store.ROOT, 'summary.json'), 'w') as f:
+        json.dump({'seconds': time.perf_counter() - start, 'pipelines': summary}, f, indent=2)
+    return 1 if any(entry['status'] == 'error' for entry in summary.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
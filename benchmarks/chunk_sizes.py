@@ -0,0 +1,127 @@
+"""Sweeps the chunking of a pipeline and reports what each setting costs and how many alerts it raises, to pick the
+smallest chunks that still meet a latency budget.
+
+Every pipeline is fitted and run once per chunk size (``--chunk-sizes``), number of chunks (``--chunk-numbers``) and
+period (``--chunk-periods``, e.g. ``W`` or ``M``, for pipelines with a timestamp column), besides its own chunking.
+Fits can't be shared between settings, since the thresholds fitted on the reference data depend on its chunks, but the
+loaded data is: it's read and prepared once per pipeline. Memory is the peak of the allocations traced while fitting and
+calculating, measured by a second, separate run so tracing doesn't slow down the timed one.
+
+    python -m benchmarks.chunk_sizes [pipeline ...] [--chunk-sizes 1000 5000] [--chunk-numbers 10]
+        [--chunk-periods W M] [--budget SECONDS] [--no-memory] [--output results.json]
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+from batch import summarize
+from pipelines import PIPELINES, estimator_class, load_data
+
+CHUNKING = ('chunk_size', 'chunk_number', 'chunk_period', 'chunker')
+
+
+def _chunked_kwargs(pipeline, chunking):
+    if chunking is None:
+        return dict(pipeline['kwargs'])
+    kwargs = {key: value for key, value in pipeline['kwargs'].items() if key not in CHUNKING}
+    return dict(kwargs, **chunking)
+
+
+def _fit_calculate(pipeline, kwargs, reference_df, analysis_df):
+    stages = {}
+    start = time.perf_counter()
+    estimator = estimator_class(pipeline)(**kwargs).fit(reference_df)
+    stages['fit'] = time.perf_counter() - start
+    method = 'estimate' if hasattr(estimator, 'estimate') else 'calculate'
+    start = time.perf_counter()
+    result = getattr(estimator, method)(analysis_df)
+    stages[method] = time.perf_counter() - start
+    return result, stages
+
+
+def _traced_peak_mb(pipeline, kwargs, reference_df, analysis_df):
+    tracemalloc.start()
+    try:
+        _fit_calculate(pipeline, kwargs, reference_df, analysis_df)
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def sweep(name, settings, memory=True):
+    """Runs pipeline ``name`` once per chunking of ``settings`` (dicts of chunking arguments, or None for its own) and
+    returns a measurement per setting."""
+    pipeline = PIPELINES[name]
+    reference_df, analysis_df = load_data(pipeline)
+    measurements = []
+    for chunking in settings:
+        kwargs = _chunked_kwargs(pipeline, chunking)
+        measurement = {
+            'pipeline': name,
+            'chunking': {key: kwargs[key] for key in CHUNKING if key in kwargs},
+        }
+        try:
+            result, stages = _fit_calculate(pipeline, kwargs, reference_df, analysis_df)
+        except Exception as exc:
+            measurements.append(dict(measurement, status='error', error=repr(exc)))
+            continue
+        measurement.update(summarize(result, sum(stages.values())), stages=stages)
+        if memory:
+            measurement['peak_traced_mb'] = _traced_peak_mb(pipeline, kwargs, reference_df, analysis_df)
+        measurements.append(measurement)
+    return measurements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pipelines', nargs='*', metavar='pipeline', help='pipelines to sweep (default: all)')
+    parser.add_argument('--chunk-sizes', type=int, nargs='*', default=[1000, 2500, 5000, 10000])
+    parser.add_argument('--chunk-numbers', type=int, nargs='*', default=[])
+    parser.add_argument('--chunk-periods', nargs='*', default=['W', 'M'],
+                        help='pandas period aliases, for pipelines with a timestamp column')
+    parser.add_argument('--budget', type=float, help='mark the settings taking longer than this many seconds')
+    parser.add_argument('--no-memory', action='store_true', help="don't measure memory, which runs every setting twice")
+    parser.add_argument('--output', help='write the measurements to this JSON file')
+    args = parser.parse_args()
+    unknown = sorted(set(args.pipelines) - set(PIPELINES))
+    if unknown:
+        parser.error(f'unknown pipelines: {", ".join(unknown)} (choose from {", ".join(PIPELINES)})')
+    if any(size <= 0 for size in args.chunk_sizes + args.chunk_numbers):
+        parser.error('chunk sizes and numbers must be positive')
+
+    measurements = []
+    for name in args.pipelines or PIPELINES:
+        kwargs = PIPELINES[name]['kwargs']
+        settings = [{'chunk_size': size} for size in args.chunk_sizes]
+        settings += [{'chunk_number': number} for number in args.chunk_numbers]
+        if kwargs.get('timestamp_column_name'):
+            settings += [{'chunk_period': period} for period in args.chunk_periods]
+        own = {key: kwargs[key] for key in CHUNKING if key in kwargs}
+        measurements += sweep(name, [None] + [s for s in settings if s != own], memory=not args.no_memory)
+    for measurement in measurements:
+        if args.budget is not None and measurement['status'] == 'ok' and measurement['seconds'] > args.budget:
+            measurement['status'] = 'over budget'
+
+    table = pd.DataFrame([{
+        'pipeline': m['pipeline'],
+        'chunking': ', '.join(f'{key}={value}' for key, value in m['chunking'].items()) or 'default',
+        'seconds': m.get('seconds'),
+        'peak_traced_mb': m.get('peak_traced_mb'),
+        'analysis_chunks': m.get('chunks'),
+        'alerts': m.get('alerts'),
+        'chunks_with_alerts': m.get('chunks_with_alerts'),
+        'status': m['status'],
+    } for m in measurements])
+    with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.float_format', '{:.2f}'.format):
+        print(table.to_string(index=False))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'budget': args.budget, 'runs': measurements}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
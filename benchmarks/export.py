@@ -0,0 +1,133 @@
+"""Compares the files of results exported with export.py, compressed and not, with Parquet and pickle files (the
+previous layout of the results store): their size, and the time and resident memory it takes to load them.
+
+Results are taken from the results store (or computed), with the rows of their frames resampled ``--scale`` times like
+``benchmarks.pipelines`` does, and loaded from each format a few times in this process. Resident memory is read from
+/proc, so it is only measured on Linux.
+
+    python -m benchmarks.export [pipeline ...] [--scale 10] [--repeat 3] [--output results.json]
+"""
+import argparse
+import gc
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+import export
+from benchmarks.pipelines import resample
+from pipelines import PIPELINES, get_results
+
+FORMATS = ('parquet', 'arrow_zstd', 'arrow')
+
+
+def _resident_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except OSError:
+        return None
+
+
+def _save_parquet(result, path):
+    os.makedirs(path)
+    shell, frames = export.split(result)
+    # Like the store used to: the chunk rows as Parquet and the other frames pickled with the result.
+    for name, frame in frames.items():
+        if name != 'data':
+            setattr(shell, name, frame)
+    with open(os.path.join(path, 'result.pkl'), 'wb') as f:
+        pickle.dump(shell, f, protocol=pickle.HIGHEST_PROTOCOL)
+    result.data.to_parquet(os.path.join(path, 'data.parquet'))
+
+
+def _load_parquet(path):
+    with open(os.path.join(path, 'result.pkl'), 'rb') as f:
+        result = pickle.load(f)
+    result.data = pd.read_parquet(os.path.join(path, 'data.parquet'))
+    return result
+
+
+def _save(result, path, form):
+    if form == 'parquet':
+        _save_parquet(result, path)
+    else:
+        export.export_result(result, path, 'zstd' if form == 'arrow_zstd' else None)
+
+
+def _load(path, form):
+    return _load_parquet(path) if form == 'parquet' else export.load_result(path)
+
+
+def _scaled(result, scale):
+    _, frames = export.split(result)
+    for name, frame in frames.items():
+        setattr(result, name, resample(frame, scale))
+    return result
+
+
+def measure(name, scale, repeat, directory):
+    """Saves the result of pipeline ``name`` in every format and returns their sizes and loading times and memory."""
+    result = _scaled(get_results(name), scale)
+    measurements = []
+    for form in FORMATS:
+        path = os.path.join(directory, f'{name}-{form}')
+        _save(result, path, form)
+        size = sum(os.path.getsize(os.path.join(path, filename)) for filename in os.listdir(path))
+        seconds, resident = [], []
+        for _ in range(repeat):
+            gc.collect()
+            before = _resident_mb()
+            start = time.perf_counter()
+            loaded = _load(path, form)
+            seconds.append(time.perf_counter() - start)
+            after = _resident_mb()
+            resident.append(None if before is None else after - before)
+            del loaded
+        measurements.append({
+            'pipeline': name,
+            'format': form,
+            'rows': len(result.data),
+            'size_mb': size / 1024 / 1024,
+            'load_seconds': min(seconds),
+            'resident_mb': None if None in resident else min(resident),
+        })
+    return measurements
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pipelines', nargs='*', metavar='pipeline', help='pipelines to measure (default: all)')
+    parser.add_argument('--scale', type=float, default=1, help='rows of the result frames, relative to their size')
+    parser.add_argument('--repeat', type=int, default=3, help='times to load each result, the fastest is kept')
+    parser.add_argument('--output', help='write the measurements to this JSON file')
+    args = parser.parse_args()
+    unknown = sorted(set(args.pipelines) - set(PIPELINES))
+    if unknown:
+        parser.error(f'unknown pipelines: {", ".join(unknown)} (choose from {", ".join(PIPELINES)})')
+    if args.scale <= 0 or args.repeat < 1:
+        parser.error('scale and repeat must be positive')
+
+    directory = tempfile.mkdtemp(prefix='export-benchmark-')
+    try:
+        measurements = []
+        for name in args.pipelines or PIPELINES:
+            measurements += measure(name, args.scale, args.repeat, directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    table = pd.DataFrame(measurements)
+    with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.float_format', '{:.3f}'.format):
+        print(table.to_string(index=False))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'scale': args.scale, 'runs': measurements}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""Load test of the app: simulates sessions rendering each page at the same time and measures the latency of their
+script runs, the CPU they use and how much the memory of the process grows.
+
+Like the Streamlit server, which runs the script of every session on a thread of its own in a single process, sessions
+are Streamlit AppTests rendering a page on threads of this process, sharing its caches and results store but not their
+session state. Every session renders its page ``--runs`` times, starting together. Each page is first rendered once
+alone, so its results are loaded or computed before it is measured, and without the warm-up of warmup.py. Run
+``python precompute.py`` first, so pages read their results instead of computing them.
+
+    python -m benchmarks.load [script ...] [--sessions 1 5 10] [--runs 3] [--budget SECONDS] [--output results.json]
+
+CPU is the CPU time of the process divided by the wall time of the runs, in cores; memory is the resident memory of
+the process, sampled from /proc, so it is only measured on Linux. With --budget, reports the largest number of sessions
+each page serves with a 95th percentile latency within the budget, and exits with status 1 when a page doesn't serve
+all of them.
+"""
+import argparse
+import contextlib
+import glob
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _resident_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except OSError:
+        return None
+
+
+class _Sampler(threading.Thread):
+    """Samples the resident memory of the process until stopped, keeping the largest."""
+
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _resident_mb()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            resident = _resident_mb()
+            if resident is not None:
+                self.peak = max(self.peak, resident)
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        return self.peak
+
+
+@contextlib.contextmanager
+def _shared_runtime():
+    # AppTest sets up a runtime of its own for every run and removes it when the run ends, which breaks the runs of
+    # other sessions still going on: sessions share one instead, like those of a server.
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+
+    runtime = mock.MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    # Sessions are created outside of script threads, which warns of a missing context as soon as a runtime exists.
+    logging.getLogger('streamlit.runtime.scriptrunner.script_run_context').addFilter(
+        lambda record: 'missing ScriptRunContext' not in record.getMessage())
+    with mock.patch.object(Runtime, 'instance', classmethod(lambda cls: runtime)), \
+            mock.patch.object(Runtime, 'exists', classmethod(lambda cls: True)):
+        yield
+
+
+def render(script, timeout):
+    """Renders ``script`` in a new session and returns how long it took and whether it raised an exception."""
+    from streamlit.testing.v1 import AppTest
+
+    start = time.perf_counter()
+    app = AppTest.from_file(os.path.join(ROOT, script), default_timeout=timeout).run()
+    return time.perf_counter() - start, bool(app.exception)
+
+
+def _session(script, runs, timeout, barrier):
+    barrier.wait()
+    return [render(script, timeout) for _ in range(runs)]
+
+
+def measure(script, sessions, runs, timeout):
+    """Renders ``script`` in ``sessions`` concurrent sessions, ``runs`` times each, and returns the measurements."""
+    barrier = threading.Barrier(sessions)
+    sampler = _Sampler()
+    resident = sampler.peak
+    sampler.start()
+    cpu, start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(sessions) as executor:
+        futures = [executor.submit(_session, script, runs, timeout, barrier) for _ in range(sessions)]
+        renders = [run for future in futures for run in future.result()]
+    seconds, cpu = time.perf_counter() - start, time.process_time() - cpu
+    peak = sampler.stop()
+
+    latencies = np.array([latency for latency, _ in renders])
+    return {
+        'script': script,
+        'sessions': sessions,
+        'renders': len(renders),
+        'exceptions': sum(exception for _, exception in renders),
+        'seconds': seconds,
+        'renders_per_second': len(renders) / seconds,
+        **{f'p{percentile}': float(np.percentile(latencies, percentile)) for percentile in PERCENTILES},
+        'max': float(latencies.max()),
+        'cpu_cores': cpu / seconds,
+        'resident_mb': resident,
+        'peak_growth_mb': None if resident is None else peak - resident,
+        'growth_mb': None if resident is None else _resident_mb() - resident,
+    }
+
+
+def capacity(measurements, budget):
+    """Returns the largest number of sessions with a 95th percentile latency within ``budget`` seconds, or 0."""
+    served = [m['sessions'] for m in measurements if m['p95'] <= budget and not m['exceptions']]
+    return max(served, default=0)
+
+
+def _summary(m):
+    summary = (f'{m["sessions"]} sessions: p50 {m["p50"]:.2f}s, p95 {m["p95"]:.2f}s, max {m["max"]:.2f}s, '
+               f'{m["renders_per_second"]:.1f} renders/s, {m["cpu_cores"]:.2f} CPU cores')
+    if m['resident_mb'] is not None:
+        summary += f', memory +{m["peak_growth_mb"]:.0f} MB at peak, +{m["growth_mb"]:.0f} MB after'
+    if m['exceptions']:
+        summary += f', {m["exceptions"]} renders raised exceptions'
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scripts', nargs='*', metavar='script', help='app.py and every page by default')
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 10], help='numbers of concurrent sessions')
+    parser.add_argument('--runs', type=int, default=3, help='renders of the page per session')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds a render may take before failing')
+    parser.add_argument('--budget', type=float, help='95th percentile latency, in seconds, pages must keep within')
+    parser.add_argument('--output', help='write the measurements to this JSON file')
+    args = parser.parse_args()
+    if any(sessions < 1 for sessions in args.sessions) or args.runs < 1:
+        parser.error('sessions and runs must be positive')
+    scripts = args.scripts or ['app.py'] + sorted(glob.glob('pages/*.py', root_dir=ROOT))
+    missing = [script for script in scripts if not os.path.isfile(os.path.join(ROOT, script))]
+    if missing:
+        parser.error(f'no such scripts: {", ".join(missing)}')
+    os.environ['NML_WARMUP'] = '0'
+
+    measurements, capacities = [], {}
+    with _shared_runtime():
+        for script in scripts:
+            first, exception = render(script, args.timeout)
+            print(f'{script}: first render {first:.2f}s' + (' (raised an exception)' if exception else ''))
+            page_measurements = []
+            for sessions in sorted(args.sessions):
+                measurement = measure(script, sessions, args.runs, args.timeout)
+                measurement['first_seconds'] = first
+                page_measurements.append(measurement)
+                print(f'    {_summary(measurement)}')
+            if args.budget is not None:
+                capacities[script] = capacity(page_measurements, args.budget)
+                print(f'    serves {capacities[script]} concurrent sessions within the {args.budget:g}s budget')
+            measurements += page_measurements
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'budget': args.budget, 'runs': args.runs, 'capacities': capacities or None,
+                       'measurements': measurements}, f, indent=2)
+    over_budget = [script for script, sessions in capacities.items() if sessions < max(args.sessions)]
+    if over_budget:
+        print(f'over the {args.budget:g}s budget: {", ".join(over_budget)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Compares the performance of many models calculated at once (see multimodel.py) with fitting and running the
+estimator of a pipeline once per model: how much faster it is and how well its values and alerts agree.
+
+The models are made up from the dataset of a pipeline, each of them from its rows resampled with another seed, and
+stacked in long-format frames with a ``model`` column.
+
+    python -m benchmarks.multimodel [pipeline ...] [--models 10 50] [--scale 1] [--output results.json]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import multimodel
+from pipelines import PIPELINES, estimator_class, load_data
+
+MULTI_MODEL_PIPELINES = [
+    name for name, pipeline in PIPELINES.items()
+    if pipeline['estimator'] in ('PerformanceCalculator', 'CBPE')
+    and pipeline['kwargs'].get('problem_type') == 'classification_binary'
+    and set(pipeline['kwargs']['metrics']) <= set(multimodel.METRICS)
+]
+MODEL_COLUMN = 'model'
+
+
+def stack(df, models, scale):
+    """Returns ``models`` resamplings of ``df`` with ``scale`` times its rows, one model each, in a long frame."""
+    frames = []
+    for model in range(models):
+        positions = np.sort(np.random.default_rng(model).integers(0, len(df), int(len(df) * scale)))
+        frames.append(df.iloc[positions].assign(**{MODEL_COLUMN: f'model_{model}'}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _timed(function):
+    start = time.perf_counter()
+    value = function()
+    return value, time.perf_counter() - start
+
+
+def _per_model(pipeline, reference_df, analysis_df):
+    estimator_type = estimator_class(pipeline)
+    results = {}
+    for model, model_analysis in analysis_df.groupby(MODEL_COLUMN, sort=False):
+        model_reference = reference_df[reference_df[MODEL_COLUMN] == model].reset_index(drop=True)
+        estimator = estimator_type(**pipeline['kwargs']).fit(model_reference)
+        method = 'estimate' if hasattr(estimator, 'estimate') else 'calculate'
+        results[model] = getattr(estimator, method)(model_analysis.reset_index(drop=True))
+    return results
+
+
+def compare(expected, actual):
+    """Returns the largest difference between the values of the results of every model and the share of equal alerts."""
+    difference, agreeing, alerts = 0.0, 0, 0
+    for model, result in expected.items():
+        values = [column for column in result.data.columns if column[0] != 'chunk' and column[-1] == 'value']
+        alert_columns = [column for column in result.data.columns if column[0] != 'chunk' and column[-1] == 'alert']
+        differences = np.abs(result.data[values].astype(float) - actual[model].data[values].astype(float))
+        difference = max(difference, float(np.nan_to_num(differences.to_numpy()).max()))
+        expected_alerts = result.data[alert_columns].fillna(False).astype(bool).to_numpy()
+        agreeing += int((expected_alerts == actual[model].data[alert_columns].astype(bool).to_numpy()).sum())
+        alerts += expected_alerts.size
+    return {'max_difference': difference, 'alert_agreement': agreeing / alerts}
+
+
+def run(name, models, scale):
+    """Runs pipeline ``name`` on ``models`` models, once per model and all at once, and returns the measurements."""
+    pipeline = PIPELINES[name]
+    reference_df, analysis_df = (stack(df, models, scale) for df in load_data(pipeline))
+    function = {
+        'PerformanceCalculator': multimodel.calculate_performance,
+        'CBPE': multimodel.estimate_performance,
+    }[pipeline['estimator']]
+
+    expected, per_model_seconds = _timed(lambda: _per_model(pipeline, reference_df, analysis_df))
+    actual, seconds = _timed(lambda: function(reference_df, analysis_df, MODEL_COLUMN, **pipeline['kwargs']))
+    return {
+        'pipeline': name,
+        'models': models,
+        'scale': scale,
+        'reference_rows': len(reference_df),
+        'analysis_rows': len(analysis_df),
+        'per_model_seconds': per_model_seconds,
+        'seconds': seconds,
+        'speedup': per_model_seconds / seconds,
+        **compare(expected, actual),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pipelines', nargs='*', metavar='pipeline',
+                        help=f'pipelines to run (default: {", ".join(MULTI_MODEL_PIPELINES)})')
+    parser.add_argument('--models', type=int, nargs='+', default=[10, 50], help='numbers of models to run')
+    parser.add_argument('--scale', type=float, default=1, help='rows of each model, relative to its dataset')
+    parser.add_argument('--output', help='write the measurements to this JSON file')
+    args = parser.parse_args()
+    unknown = sorted(set(args.pipelines) - set(MULTI_MODEL_PIPELINES))
+    if unknown:
+        parser.error(f'unknown pipelines: {", ".join(unknown)} (choose from {", ".join(MULTI_MODEL_PIPELINES)})')
+    if any(models < 1 for models in args.models) or args.scale <= 0:
+        parser.error('models and scale must be positive')
+
+    measurements = []
+    for name in args.pipelines or MULTI_MODEL_PIPELINES:
+        for models in args.models:
+            measurement = run(name, models, args.scale)
+            measurements.append(measurement)
+            print(f'{name}, {models} models ({measurement["analysis_rows"]} analysis rows): '
+                  f'{measurement["per_model_seconds"]:.2f}s per model, {measurement["seconds"]:.2f}s at once '
+                  f'({measurement["speedup"]:.1f}x faster), largest difference {measurement["max_difference"]:.1e}, '
+                  f'{measurement["alert_agreement"]:.1%} of alerts agree')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'runs': measurements}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
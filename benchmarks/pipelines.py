@@ -0,0 +1,109 @@
+"""Measures the fit, calculate/estimate and plot steps of every page's pipeline, without Streamlit.
+
+Datasets are scaled by resampling their rows with replacement (keeping them in timestamp order), so a scale of 10
+runs on ten times as many reference and analysis rows. Each run is measured in a fresh process, so its peak RSS
+doesn't include earlier runs.
+
+    python -m benchmarks.pipelines [pipeline ...] [--scales 1 10 100] [--chunk-sizes 5000 ...] [--output results.json]
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import nannyml as nml
+import numpy as np
+from nannyml.drift.univariate.result import Result as UnivariateDriftResult
+
+from pipelines import PIPELINES, load_data
+
+
+def resample(df, scale, seed=0):
+    if scale == 1:
+        return df
+    positions = np.sort(np.random.default_rng(seed).integers(0, len(df), int(len(df) * scale)))
+    return df.iloc[positions].reset_index(drop=True)
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _plot(result):
+    figures = [result.plot()]
+    if isinstance(result, UnivariateDriftResult):
+        figures.append(result.plot(kind='distribution'))
+    return figures
+
+
+def run(name, scale, chunk_size=None):
+    """Runs a pipeline on its dataset resampled to ``scale`` times its size and returns the measurements."""
+    pipeline = PIPELINES[name]
+    kwargs = dict(pipeline['kwargs'])
+    if chunk_size is not None:
+        kwargs['chunk_size'] = chunk_size
+    stages = {}
+
+    def stage(stage_name, function):
+        start = time.perf_counter()
+        value = function()
+        stages[stage_name] = {'seconds': time.perf_counter() - start, 'peak_rss_mb': _peak_rss_mb()}
+        return value
+
+    baseline_rss_mb = _peak_rss_mb()
+    reference_df, analysis_df = stage('load', lambda: [resample(df, scale) for df in load_data(pipeline)])
+    estimator = stage('fit', lambda: getattr(nml, pipeline['estimator'])(**kwargs).fit(reference_df))
+    if hasattr(estimator, 'estimate'):
+        result = stage('estimate', lambda: estimator.estimate(analysis_df))
+    else:
+        result = stage('calculate', lambda: estimator.calculate(analysis_df))
+    stage('plot', lambda: _plot(result))
+
+    return {
+        'pipeline': name,
+        'page': pipeline['page'],
+        'scale': scale,
+        'chunk_size': kwargs.get('chunk_size'),
+        'reference_rows': len(reference_df),
+        'analysis_rows': len(analysis_df),
+        'chunks': len(result.data),
+        'seconds': sum(s['seconds'] for s in stages.values()),
+        'baseline_rss_mb': baseline_rss_mb,
+        'peak_rss_mb': _peak_rss_mb(),
+        'stages': stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pipelines', nargs='*', metavar='pipeline', help='pipelines to run (default: all)')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[None],
+                        help="chunk sizes to run with (default: each pipeline's own)")
+    parser.add_argument('--output', help='write the measurements to this JSON file')
+    args = parser.parse_args()
+    unknown = sorted(set(args.pipelines) - set(PIPELINES))
+    if unknown:
+        parser.error(f'unknown pipelines: {", ".join(unknown)} (choose from {", ".join(PIPELINES)})')
+
+    context = multiprocessing.get_context('spawn')
+    runs = []
+    for name in args.pipelines or PIPELINES:
+        for scale in args.scales:
+            for chunk_size in args.chunk_sizes:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    measurement = executor.submit(run, name, scale, chunk_size).result()
+                runs.append(measurement)
+                stages = ', '.join(f'{stage} {s["seconds"]:.2f}s' for stage, s in measurement['stages'].items())
+                print(f'{name} x{scale:g} chunk_size={measurement["chunk_size"]}: {measurement["seconds"]:.2f}s '
+                      f'({stages}), peak RSS {measurement["peak_rss_mb"]:.0f} MB')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'runs': runs}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
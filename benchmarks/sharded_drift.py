@@ -0,0 +1,70 @@
+"""Measures how column-sharded univariate drift scales with the number of worker processes.
+
+The car-loan dataset is widened to the requested number of feature columns by repeating its features.
+
+    python -m benchmarks.sharded_drift [--columns 200] [--workers 1 2 4 8] [--output results.json]
+"""
+import argparse
+import json
+import os
+import time
+
+import nannyml as nml
+
+import execution
+from data import load_dataset
+from drift import calculate_univariate_drift
+
+CONTINUOUS_COLUMNS = ['car_value', 'debt_to_income_ratio', 'loan_length', 'driver_tenure']
+CATEGORICAL_COLUMNS = ['salary_range', 'size_of_downpayment', 'repaid_loan_on_prev_car']
+
+
+def widen(df, columns):
+    base_columns = CONTINUOUS_COLUMNS + CATEGORICAL_COLUMNS
+    sources = {f'{base_columns[i % len(base_columns)]}_{i}': base_columns[i % len(base_columns)] for i in range(columns)}
+    return df[['timestamp']].assign(**{name: df[source] for name, source in sources.items()}), list(sources)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--columns', type=int, default=200)
+    cpus = os.cpu_count() or 1
+    parser.add_argument('--workers', type=int, nargs='+', default=[w for w in (1, 2, 4, 8, 16, 32) if w < cpus] + [cpus])
+    parser.add_argument('--output', help='write the measurements to this JSON file')
+    args = parser.parse_args()
+
+    reference_df, analysis_df, _ = load_dataset('car_loan')
+    reference_df, column_names = widen(reference_df, args.columns)
+    analysis_df, _ = widen(analysis_df, args.columns)
+    kwargs = {
+        'timestamp_column_name': 'timestamp',
+        'continuous_methods': ['kolmogorov_smirnov', 'jensen_shannon'],
+        'categorical_methods': ['chi2', 'jensen_shannon'],
+        'chunk_size': 5000,
+    }
+
+    start = time.perf_counter()
+    nml.UnivariateDriftCalculator(column_names=column_names, **kwargs).fit(reference_df).calculate(analysis_df)
+    baseline = time.perf_counter() - start
+    print(f'{len(column_names)} columns, single calculator: {baseline:.2f}s')
+
+    measurements = []
+    for workers in args.workers:
+        os.environ['NML_WORKERS'] = str(workers)
+        execution.shutdown()
+        # The first run starts the worker processes, only the second one is measured.
+        calculate_univariate_drift(reference_df, analysis_df, column_names, **kwargs)
+        start = time.perf_counter()
+        calculate_univariate_drift(reference_df, analysis_df, column_names, **kwargs)
+        seconds = time.perf_counter() - start
+        measurements.append({'workers': workers, 'seconds': seconds, 'speedup': baseline / seconds})
+        print(f'{workers} workers: {seconds:.2f}s ({baseline / seconds:.1f}x)')
+    execution.shutdown()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'columns': len(column_names), 'baseline_seconds': baseline, 'runs': measurements}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
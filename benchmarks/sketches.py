@@ -0,0 +1,111 @@
+"""Compares approximate univariate drift from sketches (see sketches.py) with the exact calculator: how much faster it
+is and how well its values and alerts agree.
+
+Datasets are scaled by resampling their rows like ``benchmarks.pipelines`` does, and so are the chunk sizes, so a
+scale of 100 keeps the number of chunks of a pipeline but with 100 times as many rows in each.
+
+    python -m benchmarks.sketches [pipeline ...] [--scales 1 10 100] [--bins 100 1000 10000] [--output results.json]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+import sketches
+from benchmarks.pipelines import resample
+from pipelines import PIPELINES, estimator_class, load_data
+
+DRIFT_PIPELINES = [name for name, pipeline in PIPELINES.items() if pipeline['estimator'] == 'UnivariateDriftCalculator']
+
+
+def _timed(function):
+    start = time.perf_counter()
+    value = function()
+    return value, time.perf_counter() - start
+
+
+def compare(exact, approximate):
+    """Returns the largest difference between the values of each method and the share of equal alerts."""
+    methods = {}
+    for column in exact.data.columns:
+        if column[0] == 'chunk' or column[-1] != 'value':
+            continue
+        difference = np.abs(exact.data[column].astype(float) - approximate.data[column].astype(float))
+        method = methods.setdefault(column[1], {'max_difference': 0.0})
+        method['max_difference'] = max(method['max_difference'], float(np.nan_to_num(difference).max()))
+    alerts = [column for column in exact.data.columns if column[0] != 'chunk' and column[-1] == 'alert']
+    exact_alerts = exact.data[alerts].fillna(False).astype(bool).to_numpy()
+    approximate_alerts = approximate.data[alerts].fillna(False).astype(bool).to_numpy()
+    return {
+        'methods': methods,
+        'alert_agreement': float((exact_alerts == approximate_alerts).mean()),
+        'exact_alerts': int(exact_alerts.sum()),
+        'approximate_alerts': int(approximate_alerts.sum()),
+    }
+
+
+def run(name, scale, bins_list):
+    """Runs pipeline ``name`` exactly and from sketches with each of ``bins_list`` and returns the measurements."""
+    pipeline = PIPELINES[name]
+    kwargs = dict(pipeline['kwargs'])
+    if 'chunk_size' in kwargs:
+        kwargs['chunk_size'] = int(kwargs['chunk_size'] * scale)
+    reference_df, analysis_df = [resample(df, scale) for df in load_data(pipeline)]
+    exact, exact_seconds = _timed(lambda: estimator_class(pipeline)(**kwargs).fit(reference_df).calculate(analysis_df))
+
+    column_names = kwargs.pop('column_names')
+    runs = []
+    for bins in bins_list:
+        approximate, seconds = _timed(lambda: sketches.calculate_univariate_drift(
+            reference_df, analysis_df, column_names, bins=bins, **kwargs
+        ))
+        runs.append({'bins': bins, 'seconds': seconds, 'speedup': exact_seconds / seconds,
+                     **compare(exact, approximate)})
+    return {
+        'pipeline': name,
+        'scale': scale,
+        'reference_rows': len(reference_df),
+        'analysis_rows': len(analysis_df),
+        'chunks': len(exact.data),
+        'exact_seconds': exact_seconds,
+        'sketches': runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pipelines', nargs='*', metavar='pipeline',
+                        help=f'univariate drift pipelines to run (default: {", ".join(DRIFT_PIPELINES)})')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--bins', type=int, nargs='+', default=[100, sketches.BINS])
+    parser.add_argument('--output', help='write the measurements to this JSON file')
+    args = parser.parse_args()
+    unknown = sorted(set(args.pipelines) - set(DRIFT_PIPELINES))
+    if unknown:
+        parser.error(f'unknown pipelines: {", ".join(unknown)} (choose from {", ".join(DRIFT_PIPELINES)})')
+    if any(bins < 1 for bins in args.bins):
+        parser.error('bins must be positive')
+
+    measurements = []
+    for name in args.pipelines or DRIFT_PIPELINES:
+        for scale in args.scales:
+            measurement = run(name, scale, args.bins)
+            measurements.append(measurement)
+            print(f'{name} x{scale:g} ({measurement["analysis_rows"]} analysis rows): '
+                  f'exact {measurement["exact_seconds"]:.2f}s')
+            for sketched in measurement['sketches']:
+                differences = ', '.join(
+                    f'{method} {m["max_difference"]:.1e}' for method, m in sketched['methods'].items()
+                )
+                print(f'    {sketched["bins"]} bins: {sketched["seconds"]:.2f}s ({sketched["speedup"]:.1f}x faster), '
+                      f'{sketched["alert_agreement"]:.1%} of alerts agree ({sketched["approximate_alerts"]} vs '
+                      f'{sketched["exact_alerts"]}), largest differences: {differences}')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'runs': measurements}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
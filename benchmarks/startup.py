@@ -0,0 +1,89 @@
+"""Measures the cold start of the app and its pages: the time to render a script in a fresh Python process that has
+only imported Streamlit, and the import time of each package.
+
+Scripts are rendered with Streamlit's AppTest, whose own imports (``streamlit.testing``) aren't counted, and without
+the warm-up of warmup.py. Run ``python precompute.py`` first, so pages read their results instead of computing them.
+
+    python -m benchmarks.startup [script ...] [--budget SECONDS] [--top 15] [--output results.json]
+
+With --budget, exits with status 1 when a script takes longer than that to render.
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RENDER = '''
+import sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+app = AppTest.from_file(sys.argv[1], default_timeout=600).run()
+print(time.perf_counter() - start, bool(app.exception))
+'''
+
+
+def _import_times(stderr):
+    # Lines of `python -X importtime` look like "import time: <self us> | <cumulative us> | <indented module>".
+    packages = defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or line.endswith('imported package'):
+            continue
+        self_us, _, module = line[len('import time:'):].split('|')
+        module = module.strip()
+        if not module.startswith('streamlit.testing'):
+            packages[module.split('.')[0]] += int(self_us) / 1e6
+    return dict(packages)
+
+
+def measure(script):
+    """Renders ``script`` in a fresh process and returns its render time and the import time of each package."""
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', RENDER, script],
+        cwd=ROOT, capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=ROOT, NML_WARMUP='0'), check=True,
+    )
+    seconds, exception = process.stdout.split()[-2:]
+    packages = _import_times(process.stderr)
+    return {
+        'script': script,
+        'seconds': float(seconds),
+        'exception': exception == 'True',
+        'import_seconds': sum(packages.values()),
+        'packages': dict(sorted(packages.items(), key=lambda item: -item[1])),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scripts', nargs='*', metavar='script', help='app.py and every page by default')
+    parser.add_argument('--budget', type=float, help='fail when a script takes longer than this many seconds')
+    parser.add_argument('--top', type=int, default=15, help='number of packages to print per script')
+    parser.add_argument('--output', help='write the measurements to this JSON file')
+    args = parser.parse_args()
+
+    scripts = args.scripts or ['app.py'] + sorted(glob.glob('pages/*.py', root_dir=ROOT))
+    measurements = []
+    for script in scripts:
+        measurement = measure(script)
+        measurements.append(measurement)
+        print(f'{script}: {measurement["seconds"]:.2f}s, of which imports {measurement["import_seconds"]:.2f}s'
+              + (' (raised an exception)' if measurement['exception'] else ''))
+        for package, seconds in list(measurement['packages'].items())[:args.top]:
+            print(f'    {package:<30} {seconds:.3f}s')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'budget': args.budget, 'scripts': measurements}, f, indent=2)
+    over_budget = [m['script'] for m in measurements if args.budget is not None and m['seconds'] > args.budget]
+    if over_budget:
+        print(f'over the {args.budget:g}s budget: {", ".join(over_budget)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
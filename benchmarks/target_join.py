@@ -0,0 +1,51 @@
+"""Compares the memory needed to add the targets to the analysis data with ``merge`` and with ``join_targets``.
+
+Memory is the peak of new allocations made by the join, as traced by tracemalloc (numpy reports its buffers to it).
+
+    python -m benchmarks.target_join [--dataset car_loan] [--output results.json]
+"""
+import argparse
+import json
+import tracemalloc
+
+from data import DATASETS, join_targets, load_dataset
+
+JOINS = {
+    'merge': lambda analysis_df, targets_df: analysis_df.merge(targets_df, left_index=True, right_index=True),
+    'join_targets': join_targets,
+    'join_targets_downcast': lambda analysis_df, targets_df: join_targets(analysis_df, targets_df, downcast_columns=True),
+}
+
+
+def measure(join, analysis_df, targets_df):
+    tracemalloc.start()
+    joined = join(analysis_df, targets_df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'peak_bytes': peak, 'frame_bytes': int(joined.memory_usage(index=True, deep=True).sum())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default='car_loan', choices=sorted(DATASETS))
+    parser.add_argument('--output', help='write the measurements to this JSON file')
+    args = parser.parse_args()
+
+    _, analysis_df, targets_df = load_dataset(args.dataset)
+    analysis_bytes = int(analysis_df.memory_usage(index=True, deep=True).sum())
+    print(f'{args.dataset} analysis data: {analysis_bytes / 1e6:.1f} MB')
+
+    measurements = {name: measure(join, analysis_df, targets_df) for name, join in JOINS.items()}
+    for name, measurement in measurements.items():
+        print(
+            f"{name}: {measurement['peak_bytes'] / 1e6:.1f} MB allocated, "
+            f"joined frame {measurement['frame_bytes'] / 1e6:.1f} MB"
+        )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'dataset': args.dataset, 'analysis_bytes': analysis_bytes, 'joins': measurements}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Process-wide, thread-safe LRU cache bounded by the total size of its values.
+
+    Values are shared between all callers, so they must be treated as read-only.
+    Concurrent requests for the same missing key wait for a single load instead of
+    loading the value once per session.
+    """
+
+    def __init__(self, max_bytes, sizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]['value']
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]['value']
+                self.misses += 1
+
+            start = time.perf_counter()
+            value = loader()
+            entry = {
+                'value': value,
+                'bytes': self.sizeof(value),
+                'load_seconds': time.perf_counter() - start,
+            }
+
+            with self._lock:
+                self._entries[key] = entry
+                self._evict()
+                self._key_locks.pop(key, None)
+            return value
+
+    def _evict(self):
+        # The newest entry is always kept, even when it alone exceeds the budget.
+        while len(self._entries) > 1 and self.total_bytes() > self.max_bytes:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self._entries.values())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': {
+                    str(key): {'bytes': entry['bytes'], 'load_seconds': entry['load_seconds']}
+                    for key, entry in self._entries.items()
+                },
+                'total_bytes': self.total_bytes(),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
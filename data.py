@@ -0,0 +1,250 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from cache import LRUCache
+from instrumentation import stage
+
+# Names of the nannyml functions loading each dataset. nannyml takes seconds to import, so it is only
+# imported once a dataset is loaded.
+DATASETS = {
+    'car_loan': 'load_synthetic_car_loan_dataset',
+    'car_price': 'load_synthetic_car_price_dataset',
+    'census_employment': 'load_us_census_ma_employment_data',
+    'titanic': 'load_titanic_dataset',
+}
+
+
+def _sizeof(frames):
+    return int(sum(df.memory_usage(index=True, deep=True).sum() for df in frames if df is not None))
+
+
+_cache = LRUCache(
+    max_bytes=int(os.environ.get('NML_DATASET_CACHE_MB', 512)) * 1024 * 1024,
+    sizeof=_sizeof,
+)
+
+
+def _freeze(df):
+    # Frames are shared by every session, so any in-place write is a bug: make it fail loudly.
+    for array in df._mgr.arrays:
+        if isinstance(array, np.ndarray):
+            array.flags.writeable = False
+    return df
+
+
+_dtype_reports = {}
+
+
+def _load(name):
+    import nannyml as nml
+
+    with stage('load_dataset', dataset=name) as record:
+        frames = getattr(nml, DATASETS[name])()
+        if os.environ.get('NML_OPTIMIZE_DTYPES', '1') != '0':
+            frames, _dtype_reports[name] = optimize_dtypes(frames)
+        record['rows'] = sum(len(df) for df in frames)
+    return tuple(_freeze(df) for df in frames)
+
+
+def load_dataset(name):
+    """Returns the (reference, analysis, analysis_targets) frames of a bundled dataset.
+
+    Frames are loaded once per process and shared read-only between all sessions.
+    Use ``df.copy()`` before modifying them.
+    """
+    if name not in DATASETS:
+        raise ValueError(f"unknown dataset '{name}', expected one of {sorted(DATASETS)}")
+    return _cache.get_or_load(name, lambda: _load(name))
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def _target_dtype(columns, max_categories):
+    # The smallest dtype holding every value of ``columns`` (the same column in several frames) without loss.
+    # Floats stay float64: even when their values fit a float32, sums and errors calculated in float32 don't.
+    dtypes = {column.dtype for column in columns}
+    if len(dtypes) > 1:
+        return None
+    dtype = dtypes.pop()
+    if pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        bounds = pd.Series([min(column.min() for column in columns), max(column.max() for column in columns)])
+        return pd.to_numeric(bounds, downcast='integer' if bounds[0] < 0 else 'unsigned').dtype
+    if dtype == object:
+        # Too many distinct values in the first rows already rules categoricals out, without hashing every value.
+        if any(column.iloc[:10 * max_categories].nunique() > max_categories for column in columns):
+            return None
+        categories = pd.concat([column.dropna() for column in columns]).unique()
+        if len(categories) <= max_categories and all(isinstance(c, str) for c in categories):
+            return pd.CategoricalDtype(sorted(categories))
+    return None
+
+
+def downcast(series, max_categories=50):
+    """Returns ``series`` with the smallest integer dtype fitting its values, or as a categorical for strings with at
+    most ``max_categories`` distinct values. Other series are returned as they are.
+    """
+    dtype = _target_dtype([series], max_categories)
+    return series if dtype is None else series.astype(dtype)
+
+
+def optimize_dtypes(frames, max_categories=50):
+    """Downcasts the columns of related frames (e.g. reference and analysis data) the way :func:`downcast` does.
+
+    A column gets the same dtype in every frame having it, so categoricals share their categories and values compare
+    between frames as before. Returns the converted frames and a report with the memory saved per frame and column.
+    """
+    names = dict.fromkeys(column for df in frames for column in df.columns)
+    dtypes = {}
+    for name in names:
+        dtype = _target_dtype([df[name] for df in frames if name in df.columns], max_categories)
+        if dtype is not None:
+            dtypes[name] = dtype
+
+    optimized, report = [], []
+    for frame, df in enumerate(frames):
+        converted = df.astype({name: dtype for name, dtype in dtypes.items() if name in df.columns})
+        for name in dtypes:
+            if name in df.columns:
+                before = int(df[name].memory_usage(index=False, deep=True))
+                after = int(converted[name].memory_usage(index=False, deep=True))
+                report.append({
+                    'frame': frame,
+                    'column': name,
+                    'dtype_before': str(df[name].dtype),
+                    'dtype_after': str(converted[name].dtype),
+                    'bytes_before': before,
+                    'bytes_after': after,
+                    'bytes_saved': before - after,
+                })
+        optimized.append(converted)
+    return tuple(optimized), pd.DataFrame(report)
+
+
+def dtype_report(name):
+    """Returns the memory saved per frame and column by :func:`optimize_dtypes` when ``name`` was loaded.
+
+    Frames are numbered in the order :func:`load_dataset` returns them. The report is empty until the dataset is loaded,
+    or when ``NML_OPTIMIZE_DTYPES=0`` turns the optimization off.
+    """
+    return _dtype_reports.get(name, pd.DataFrame())
+
+
+def categoricals_as_objects(df):
+    """Returns ``df`` with its categorical columns as object columns, sharing all other columns with ``df``.
+
+    For estimators that don't take categoricals, e.g. ``DataReconstructionDriftCalculator``, whose scikit-learn imputer
+    can't handle them.
+    """
+    converted = df.copy(deep=False)
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            converted[column] = df[column].astype(object)
+    return converted
+
+
+def chunk_column(data, name):
+    """Returns the column ``name`` of the chunk columns of the ``data`` of a nannyml result, e.g. ``'period'``."""
+    return next(column for column in data.columns if column[0] == 'chunk' and column[-1] == name)
+
+
+def join_targets(analysis_df, analysis_targets_df, downcast_columns=False):
+    """Returns ``analysis_df`` with the columns of ``analysis_targets_df`` it doesn't have yet, aligned on the index.
+
+    Unlike ``analysis_df.merge(analysis_targets_df, left_index=True, right_index=True)`` this doesn't copy the
+    analysis columns: the returned frame shares them with ``analysis_df`` and only allocates the target columns.
+    Rows without a target get a missing value instead of being dropped.
+    With ``downcast_columns``, the added columns and the low-cardinality analysis columns are downcast as well,
+    see :func:`downcast`.
+    """
+    joined = analysis_df.copy(deep=False)
+    for column in analysis_targets_df.columns.difference(analysis_df.columns, sort=False):
+        joined[column] = analysis_targets_df[column]
+    if downcast_columns:
+        for column in joined.columns:
+            downcast_column = downcast(joined[column])
+            # Assigning a column copies it, so only the ones whose dtype changes are.
+            if downcast_column.dtype != joined[column].dtype:
+                joined[column] = downcast_column
+    return joined
+
+
+def read_file(path):
+    """Reads a whole Parquet (``.parquet``) or CSV file into a frame."""
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def file_signature(path):
+    """Identifies the content of a file by its path, size and modification time, without reading it."""
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def _load_files(paths):
+    frames = [read_file(path) for path in paths if path is not None]
+    if os.environ.get('NML_OPTIMIZE_DTYPES', '1') != '0':
+        frames = optimize_dtypes(frames)[0]
+    frames = [_freeze(df) for df in frames]
+    return tuple(frames) + (None,) * (len(paths) - len(frames))
+
+
+def load_files(reference_path, analysis_path, analysis_targets_path=None):
+    """Returns the (reference, analysis, analysis_targets) frames read from Parquet or CSV files, like
+    :func:`load_dataset` does for the bundled datasets. ``analysis_targets`` is None without ``analysis_targets_path``.
+
+    Frames are cached until the files change.
+    """
+    paths = (reference_path, analysis_path, analysis_targets_path)
+    key = json.dumps([file_signature(path) if path else None for path in paths])
+    return _cache.get_or_load(key, lambda: _load_files(paths))
+
+
+def _read_file_batches(path, batch_size):
+    if path.endswith('.parquet'):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=batch_size)
+
+
+def read_batches(path, batch_size, targets_path=None):
+    """Yields consecutive ``batch_size``-row frames of a Parquet or CSV file, never holding the whole file in memory.
+
+    When ``targets_path`` is given, its rows are read alongside and joined by position with :func:`join_targets`, and
+    both files must have as many rows. Batches are indexed by their row positions in the file.
+    """
+    batches = _read_file_batches(path, batch_size)
+    targets_batches = _read_file_batches(targets_path, batch_size) if targets_path else None
+    # Target rows read but not joined yet: batches of both files needn't end on the same rows.
+    pending = []
+    pending_rows = 0
+    start = 0
+    for batch in batches:
+        batch.index = pd.RangeIndex(start, start + len(batch))
+        if targets_batches is not None:
+            while pending_rows < len(batch):
+                targets_batch = next(targets_batches, None)
+                if targets_batch is None:
+                    raise ValueError(f"'{targets_path}' has fewer rows ({start + pending_rows}) than '{path}' "
+                                     f'(at least {start + len(batch)}), expected a row of targets per row')
+                pending.append(targets_batch)
+                pending_rows += len(targets_batch)
+            targets = pd.concat(pending, ignore_index=True) if len(pending) > 1 else pending[0]
+            targets_batch = targets.iloc[:len(batch)].set_axis(batch.index)
+            pending = [targets.iloc[len(batch):]] if pending_rows > len(batch) else []
+            pending_rows -= len(batch)
+            batch = join_targets(batch, targets_batch)
+        start += len(batch)
+        yield batch
+    if targets_batches is not None:
+        extra = pending_rows + sum(len(targets_batch) for targets_batch in targets_batches)
+        if extra:
+            raise ValueError(f"'{targets_path}' has more rows ({start + extra}) than '{path}' ({start}), "
+                             'expected a row of targets per row')
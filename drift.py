@@ -0,0 +1,94 @@
+"""Univariate drift for wide feature sets, with columns split into shards calculated in parallel worker processes."""
+import nannyml as nml
+import pandas as pd
+from nannyml.drift.univariate.result import Result
+
+import execution
+
+
+def _fit_calculate(kwargs, reference_df, analysis_df):
+    return nml.UnivariateDriftCalculator(**kwargs).fit(reference_df).calculate(analysis_df)
+
+
+def _shard_kwargs(kwargs, column_names):
+    shard_kwargs = dict(kwargs, column_names=column_names)
+    for key in ('treat_as_categorical', 'treat_as_continuous'):
+        if kwargs.get(key):
+            shard_kwargs[key] = [c for c in kwargs[key] if c in column_names]
+    return shard_kwargs
+
+
+def _shard_frame(df, column_names, timestamp_column_name):
+    columns = column_names + ([timestamp_column_name] if timestamp_column_name else [])
+    return df[columns]
+
+
+def merge_results(results, column_names=None, continuous_methods=None, categorical_methods=None):
+    """Merges univariate drift results calculated on the same data and chunks for different columns into one.
+
+    Columns are ordered as in ``column_names`` when given, in the order of the results otherwise. The method names of
+    the merged result are ordered as in ``continuous_methods`` and ``categorical_methods`` when given.
+    """
+    first = results[0]
+    order = column_names or [c for result in results for c in result.column_names]
+    continuous_column_names = [c for c in order if any(c in result.continuous_column_names for result in results)]
+    categorical_column_names = [c for c in order if any(c in result.categorical_column_names for result in results)]
+
+    chunk_columns = [column for column in first.data.columns if column[0] == 'chunk']
+    data = pd.concat([first.data[chunk_columns]] + [result.data.drop(columns=chunk_columns) for result in results], axis=1)
+    ordered = chunk_columns + [column for name in order for column in data.columns if column[0] == name]
+
+    def method_names(names, methods):
+        names = list(dict.fromkeys(names))
+        return [m for m in methods if m in names] if methods else names
+
+    def merge_frames(frames):
+        if any(df is None for df in frames):
+            return None
+        return pd.concat(frames, axis=1).loc[:, lambda df: ~df.columns.duplicated()]
+
+    merged = Result(
+        results_data=data[ordered],
+        column_names=continuous_column_names + categorical_column_names,
+        continuous_column_names=continuous_column_names,
+        categorical_column_names=categorical_column_names,
+        continuous_method_names=method_names(
+            (m for result in results for m in result.continuous_method_names), continuous_methods
+        ),
+        categorical_method_names=method_names(
+            (m for result in results for m in result.categorical_method_names), categorical_methods
+        ),
+        timestamp_column_name=first.timestamp_column_name,
+        chunker=first.chunker,
+    )
+    merged.reference_data = merge_frames([result.reference_data for result in results])
+    merged.analysis_data = merge_frames([result.analysis_data for result in results])
+    return merged
+
+
+def calculate_univariate_drift(reference_df, analysis_df, column_names, shards=None, **kwargs):
+    """Fits ``nml.UnivariateDriftCalculator(column_names=column_names, **kwargs)`` and calculates its results.
+
+    Columns are split into ``shards`` groups (default: one per worker process, see :mod:`execution`), each fitted
+    and calculated in its own worker on just its columns. The merged result is the same as a single calculator's,
+    so it can be filtered, plotted and ranked by ``AlertCountRanker`` and ``CorrelationRanker`` as usual.
+    """
+    shards = min(shards or execution.max_workers(), len(column_names))
+    if shards <= 1:
+        return _fit_calculate(dict(kwargs, column_names=column_names), reference_df, analysis_df)
+
+    timestamp_column_name = kwargs.get('timestamp_column_name')
+    jobs = {}
+    for shard in range(shards):
+        shard_columns = column_names[shard::shards]
+        jobs[shard] = (
+            _fit_calculate,
+            _shard_kwargs(kwargs, shard_columns),
+            _shard_frame(reference_df, shard_columns, timestamp_column_name),
+            _shard_frame(analysis_df, shard_columns, timestamp_column_name),
+        )
+    results = execution.run(jobs)
+    for job in results.values():
+        if job.error is not None:
+            raise job.error
+    return merge_results([results[shard].value for shard in range(shards)], column_names)
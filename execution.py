@@ -0,0 +1,116 @@
+"""Runs independent jobs, like fitting and calculating separate pipelines, in parallel worker processes.
+
+Workers are forked from a single-threaded fork server (forking the multithreaded Streamlit server itself is unsafe)
+and reused across calls. The number of workers defaults to the number of CPUs and can be set with ``NML_WORKERS``.
+"""
+import contextlib
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import instrumentation
+
+JobResult = namedtuple('JobResult', 'name value error seconds')
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_worker = False
+
+
+def max_workers():
+    # Jobs running in a worker don't start pools of their own.
+    if _in_worker:
+        return 1
+    return int(os.environ.get('NML_WORKERS', os.cpu_count() or 1))
+
+
+def _init_worker():
+    global _in_worker
+    _in_worker = True
+
+
+@contextlib.contextmanager
+def _empty_main_module():
+    # New processes import the __main__ module, which Streamlit points at the running page script.
+    main_module = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main_module
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        context = multiprocessing.get_context('forkserver')
+        # Workers are forked from a server process that has already imported these.
+        context.set_forkserver_preload(['nannyml', 'pipelines'])
+        _executor = ProcessPoolExecutor(max_workers=max_workers(), mp_context=context, initializer=_init_worker)
+    return _executor
+
+
+def _reset_executor(executor):
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    """Stops the worker processes, e.g. to start a pool of another size after changing ``NML_WORKERS``."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
+
+
+def _timed(function, args, labels=None):
+    # Also returns the stages recorded by the job, so a worker can hand them to the calling process.
+    with instrumentation.capture(labels, forward=_in_worker) as records:
+        start = time.perf_counter()
+        try:
+            return function(*args), None, time.perf_counter() - start, records
+        except Exception as exc:
+            return None, exc, time.perf_counter() - start, records
+
+
+def run(jobs):
+    """Runs ``{name: (function, *args)}`` jobs in parallel and returns ``{name: JobResult}`` once all have finished.
+
+    Functions and arguments must be picklable, e.g. module level functions. A job raising an exception doesn't affect
+    the other jobs: the exception is returned in its ``JobResult.error`` and ``value`` is None. A crashing worker
+    breaks the whole pool instead, so unfinished jobs fail with ``BrokenProcessPool`` and the pool is recreated.
+    ``seconds`` is the time the job took in its worker, excluding the time it waited for one.
+    With a single worker the jobs run one after another in the calling process.
+    """
+    labels = instrumentation.labels()
+    if max_workers() == 1:
+        return {name: JobResult(name, *_timed(job[0], job[1:], labels)[:3]) for name, job in jobs.items()}
+
+    # Workers are started on demand when jobs are submitted.
+    with _executor_lock, _empty_main_module():
+        executor = _get_executor()
+        futures = {name: executor.submit(_timed, job[0], job[1:], labels) for name, job in jobs.items()}
+
+    results = {}
+    for name, future in futures.items():
+        try:
+            value, error, seconds, records = future.result()
+            instrumentation.add(records)
+            results[name] = JobResult(name, value, error, seconds)
+        except BrokenProcessPool as exc:
+            _reset_executor(executor)
+            results[name] = JobResult(name, None, exc, None)
+        except Exception as exc:
+            # Raised outside of the job, e.g. when its value can't be pickled or unpickled.
+            results[name] = JobResult(name, None, exc, None)
+    return results
@@ -0,0 +1,152 @@
+"""Exports results to compact columnar files and loads them back, so other processes and the dashboard can read large
+results without recomputing them, and without each of them holding a copy in memory.
+
+An exported result is a directory with the result object pickled without its frames (metrics, column names, chunker,
+...) and each of its frames in an Arrow IPC file: the chunk rows of ``data`` and, for univariate drift results, the
+``reference_data`` and ``analysis_data`` of their distribution plots.
+
+    <path>/result.pkl
+    <path>/data.arrow
+    <path>/reference_data.arrow
+    <path>/analysis_data.arrow
+
+Frames are compressed with zstd by default. Loading memory-maps them: the numeric columns of uncompressed frames are
+views of the mapped files, which are only read as they are used and shared by all the processes loading them, while
+compressed frames are decompressed into memory. The results store (see store.py) keeps its results in the same files.
+
+    python export.py [pipeline ...] --output DIR [--compression zstd|lz4|none]
+"""
+import argparse
+import copy
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+
+# The frames of result objects stored in files of their own.
+FRAMES = ('data', 'reference_data', 'analysis_data')
+COMPRESSIONS = ('zstd', 'lz4', None)
+
+_INDEX = '__index__'
+
+
+def _field_name(column):
+    return '.'.join(map(str, column)) if isinstance(column, tuple) else str(column)
+
+
+def _array(series):
+    if series.dtype.kind == 'f':
+        # NaN stays NaN rather than becoming null, so the column can be read back without copying it.
+        return pa.array(series.to_numpy(), from_pandas=False)
+    return pa.array(series, from_pandas=True)
+
+
+def write_frame(df, sink, compression='zstd'):
+    """Writes a data frame to ``sink``, a path or a binary file, as an Arrow IPC file compressed with ``compression``.
+
+    Columns are named after their labels (``a.b.c`` for the levels of multi-level labels), which are kept in the
+    schema metadata so :func:`read_frame` restores them.
+    """
+    arrays = [_array(df.iloc[:, position]) for position in range(df.shape[1])]
+    names = [_field_name(column) for column in df.columns]
+    metadata = {'columns': json.dumps([list(c) if isinstance(c, tuple) else c for c in df.columns])}
+    if not df.index.equals(pd.RangeIndex(len(df))):
+        arrays.append(_array(df.index.to_series()))
+        names.append(_INDEX)
+        metadata['index_name'] = json.dumps(df.index.name)
+    table = pa.Table.from_arrays(arrays, names=names, metadata=metadata)
+    with ipc.new_file(sink, table.schema, options=ipc.IpcWriteOptions(compression=compression)) as writer:
+        writer.write_table(table)
+
+
+def read_frame(path, memory_map=True):
+    """Reads a data frame written by :func:`write_frame`, memory-mapping the file unless ``memory_map`` is False."""
+    source = pa.memory_map(path) if memory_map else pa.OSFile(path)
+    table = ipc.open_file(source).read_all()
+    # One block per column, so columns are views of the file rather than copied into consolidated blocks.
+    df = table.to_pandas(split_blocks=True)
+    metadata = table.schema.metadata
+    if b'index_name' in metadata:
+        df.index = pd.Index(df.pop(_INDEX), name=json.loads(metadata[b'index_name']))
+    columns = json.loads(metadata[b'columns'])
+    if any(isinstance(column, list) for column in columns):
+        df.columns = pd.MultiIndex.from_tuples([tuple(column) for column in columns])
+    else:
+        df.columns = columns
+    return df
+
+
+def split(result):
+    """Returns a copy of a result object without its frames and ``{name: frame}`` with the frames it has."""
+    shell = copy.copy(result)
+    frames = {}
+    for name in FRAMES:
+        frame = getattr(result, name, None)
+        if isinstance(frame, pd.DataFrame):
+            frames[name] = frame
+            setattr(shell, name, None)
+    return shell, frames
+
+
+def export_result(result, path, compression='zstd'):
+    """Exports a result object to the directory ``path``, replacing it at once when it exists."""
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    directory = tempfile.mkdtemp(dir=parent, prefix='.export-')
+    shell, frames = split(result)
+    with open(os.path.join(directory, 'result.pkl'), 'wb') as f:
+        pickle.dump(shell, f, protocol=pickle.HIGHEST_PROTOCOL)
+    for name, frame in frames.items():
+        write_frame(frame, os.path.join(directory, f'{name}.arrow'), compression)
+
+    # Processes loading the previous export meanwhile keep reading its files, which are only unlinked.
+    previous = None
+    if os.path.exists(path):
+        previous = tempfile.mkdtemp(dir=parent, prefix='.export-')
+        os.replace(path, os.path.join(previous, 'result'))
+    os.replace(directory, path)
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
+
+
+def load_result(path, memory_map=True):
+    """Loads a result object exported to the directory ``path``, memory-mapping its frames unless ``memory_map`` is
+    False."""
+    with open(os.path.join(path, 'result.pkl'), 'rb') as f:
+        result = pickle.load(f)
+    for name in FRAMES:
+        frame_path = os.path.join(path, f'{name}.arrow')
+        if os.path.exists(frame_path):
+            setattr(result, name, read_frame(frame_path, memory_map))
+    return result
+
+
+def main():
+    from pipelines import PIPELINES, get_results
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pipelines', nargs='*', metavar='pipeline', help='pipelines to export (default: all)')
+    parser.add_argument('--output', required=True, help='directory to export the results to, one directory each')
+    parser.add_argument('--compression', choices=['zstd', 'lz4', 'none'], default='zstd')
+    args = parser.parse_args()
+    unknown = sorted(set(args.pipelines) - set(PIPELINES))
+    if unknown:
+        parser.error(f'unknown pipelines: {", ".join(unknown)} (choose from {", ".join(PIPELINES)})')
+
+    compression = None if args.compression == 'none' else args.compression
+    for name in args.pipelines or PIPELINES:
+        path = os.path.join(args.output, name)
+        export_result(get_results(name), path, compression)
+        size = sum(os.path.getsize(os.path.join(path, filename)) for filename in os.listdir(path))
+        print(f'{name}: {size / 1024 / 1024:.2f} MB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import contextlib
+import copy
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import weakref
+
+import pandas as pd
+
+from cache import LRUCache
+
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def fingerprint(df):
+    """Returns a content hash of a data frame, memoized for the lifetime of the frame."""
+    with _fingerprints_lock:
+        if id(df) in _fingerprints:
+            return _fingerprints[id(df)]
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in df.columns]).encode())
+    digest.update(json.dumps([str(t) for t in df.dtypes]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    value = digest.hexdigest()
+
+    with _fingerprints_lock:
+        _fingerprints[id(df)] = value
+    weakref.finalize(df, _fingerprints.pop, id(df), None)
+    return value
+
+
+def config_key(estimator_class, kwargs):
+    config = json.dumps(kwargs, sort_keys=True, default=repr)
+    return f'{estimator_class.__module__}.{estimator_class.__qualname__}({config})'
+
+
+def _persisted_size(estimator):
+    return len(pickle.dumps(estimator, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+_cache = LRUCache(
+    max_bytes=int(os.environ.get('NML_FIT_CACHE_MB', 1024)) * 1024 * 1024,
+    sizeof=_persisted_size,
+)
+
+
+def _disk_path(key):
+    directory = os.environ.get('NML_FIT_CACHE_DIR')
+    return os.path.join(directory, f'{key}.pkl') if directory else None
+
+
+def _evict_disk(directory):
+    # Worker processes share the directory: files may be removed by another one meanwhile.
+    max_bytes = int(os.environ.get('NML_FIT_CACHE_DISK_MB', 2048)) * 1024 * 1024
+    files = []
+    for name in os.listdir(directory):
+        if name.endswith('.pkl'):
+            with contextlib.suppress(FileNotFoundError):
+                stat = os.stat(os.path.join(directory, name))
+                files.append((stat.st_mtime, stat.st_size, os.path.join(directory, name)))
+    files.sort(reverse=True)
+    total = 0
+    for _, size, path in files:
+        total += size
+        if total > max_bytes:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+
+def _load_disk(path):
+    # None when the file isn't there, or was evicted by another process meanwhile.
+    try:
+        os.utime(path)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _load_or_fit(key, estimator_class, reference_df, kwargs):
+    path = _disk_path(key)
+    estimator = _load_disk(path) if path else None
+    if estimator is not None:
+        return estimator
+
+    estimator = estimator_class(**kwargs).fit(reference_df)
+
+    if path:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as f:
+            pickle.dump(estimator, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f.name, path)
+        _evict_disk(directory)
+    return estimator
+
+
+def fit(estimator_class, reference_df, **kwargs):
+    """Returns ``estimator_class(**kwargs).fit(reference_df)``, reusing an earlier fit when possible.
+
+    Fits are keyed by the constructor arguments, a content fingerprint of the reference data and the nannyml version.
+    They are kept in memory (bounded by ``NML_FIT_CACHE_MB``) and, when ``NML_FIT_CACHE_DIR`` is set,
+    pickled to disk (bounded by ``NML_FIT_CACHE_DISK_MB``) so they survive restarts.
+    Each caller gets its own copy, since calculating results updates the estimator state.
+    """
+    import nannyml as nml
+
+    source = config_key(estimator_class, kwargs) + fingerprint(reference_df) + nml.__version__
+    key = hashlib.sha256(source.encode()).hexdigest()
+    estimator = _cache.get_or_load(key, lambda: _load_or_fit(key, estimator_class, reference_df, kwargs))
+    return copy.deepcopy(estimator)
+
+
+def cache_stats():
+    return _cache.stats()
@@ -0,0 +1,150 @@
+"""Incremental refresh of pipeline results as new analysis data arrives.
+
+Each call to :func:`update` only calculates the chunks completed by the new rows and appends them to the stored
+results. Rows that don't fill a chunk yet are kept aside and prepended to the next update. Estimators are fitted
+(once, see :mod:`fitting`) on the pipeline reference data, so all chunks share the thresholds derived from it.
+
+New rows can also be streamed from Parquet or CSV files with :func:`update_from_file`.
+
+Analysis data is assumed to be append-only: rows passed to an earlier update are never recalculated.
+Results of ``UnivariateDriftCalculator`` keep the analysis data of the first update only, so their
+``plot(kind='distribution')`` doesn't cover later updates.
+"""
+import hashlib
+import json
+import os
+
+import nannyml as nml
+import pandas as pd
+
+import store
+from data import categoricals_as_objects, chunk_column, read_batches
+from fitting import config_key, fingerprint, fit
+from pipelines import OBJECT_CATEGORICALS, PIPELINES, load_data
+
+
+def store_name(name):
+    return f'{name}-incremental'
+
+
+def _kwargs(pipeline, chunk_size):
+    kwargs = dict(pipeline['kwargs'])
+    if chunk_size is not None:
+        kwargs['chunk_size'] = chunk_size
+    if 'chunk_size' not in kwargs:
+        raise ValueError('incremental updates need a fixed chunk size, pass chunk_size')
+    return kwargs
+
+
+def _offset(data, rows, chunks):
+    data = data.reset_index(drop=True)
+    start_index, end_index = chunk_column(data, 'start_index'), chunk_column(data, 'end_index')
+    data[start_index] += rows
+    data[end_index] += rows
+    data[chunk_column(data, 'chunk_index')] += chunks
+    data[chunk_column(data, 'key')] = '[' + data[start_index].astype(str) + ':' + data[end_index].astype(str) + ']'
+    return data
+
+
+def _pending_file(rows):
+    return f'pending-{rows}.parquet'
+
+
+def _read_state(name, key):
+    # The state is kept in the manifest entry of the results, so it changes atomically with their parts.
+    entry = store.manifest().get(name)
+    state = entry['incremental'] if entry else {'rows': 0, 'chunks': 0}
+    pending_path = store.path(name, key, _pending_file(state['rows']))
+    pending = pd.read_parquet(pending_path) if os.path.exists(pending_path) else None
+    return state, pending
+
+
+def _write_pending(name, key, rows, pending):
+    # Written before the chunks are appended, under the number of rows calculated after them, so a crash in between
+    # leaves the previous state and its pending rows in place.
+    if len(pending):
+        store.write_file(name, key, _pending_file(rows), pending.to_parquet)
+    elif os.path.exists(store.path(name, key, _pending_file(rows))):
+        os.remove(store.path(name, key, _pending_file(rows)))
+
+
+def _remove_pending(name, key, rows):
+    directory = os.path.dirname(store.path(name, key, _pending_file(rows)))
+    for filename in os.listdir(directory) if os.path.isdir(directory) else ():
+        if filename.startswith('pending-') and filename != _pending_file(rows):
+            os.remove(os.path.join(directory, filename))
+
+
+def update(name, new_analysis_df, chunk_size=None):
+    """Calculates the chunks completed by ``new_analysis_df`` and appends them to the stored results of a pipeline.
+
+    ``new_analysis_df`` holds only the rows that arrived since the previous update, including the target column for
+    pipelines that need one. Returns the number of chunks added.
+
+    Raises ``ValueError`` when the stored results were calculated from other inputs, e.g. another ``chunk_size``, since
+    appending to them would mix chunks that don't compare. See :func:`reset`.
+    """
+    pipeline = PIPELINES[name]
+    kwargs = _kwargs(pipeline, chunk_size)
+    estimator_class = getattr(nml, pipeline['estimator'])
+    reference_df = load_data(pipeline)[0]
+    source = [config_key(estimator_class, kwargs), fingerprint(reference_df), nml.__version__]
+    key = hashlib.sha256(json.dumps(source).encode()).hexdigest()
+    target = store_name(name)
+
+    with store.lock(target):
+        if any(other != key for other in store.keys(target)):
+            raise ValueError(
+                f'the incremental results of {name} were calculated with another configuration, reference data or '
+                f'version of nannyml, call reset({name!r}) to start them again'
+            )
+
+        state, pending = _read_state(target, key)
+        batch = new_analysis_df if pending is None else pd.concat([pending, new_analysis_df])
+        batch = batch.reset_index(drop=True)
+        if pipeline['estimator'] in OBJECT_CATEGORICALS:
+            batch = categoricals_as_objects(batch)
+        complete = len(batch) // kwargs['chunk_size'] * kwargs['chunk_size']
+        _write_pending(target, key, state['rows'] + complete, batch.iloc[complete:])
+
+        chunks = 0
+        if complete:
+            estimator = fit(estimator_class, reference_df, **kwargs)
+            if hasattr(estimator, 'estimate'):
+                result = estimator.estimate(batch.iloc[:complete])
+            else:
+                result = estimator.calculate(batch.iloc[:complete])
+
+            is_analysis = result.data[chunk_column(result.data, 'period')] == 'analysis'
+            analysis = _offset(result.data[is_analysis], state['rows'], state['chunks'])
+            chunks = len(analysis)
+            state = {'rows': state['rows'] + complete, 'chunks': state['chunks'] + chunks}
+            if state['rows'] == complete:
+                result.data = pd.concat([result.data[~is_analysis], analysis], ignore_index=True)
+                store.save(target, key, result, incremental=state)
+            else:
+                store.append(target, analysis, incremental=state)
+            _remove_pending(target, key, state['rows'])
+
+    return chunks
+
+
+def reset(name):
+    """Removes the incrementally updated results of a pipeline and its pending rows, so the next update starts again."""
+    with store.lock(store_name(name)):
+        store.remove(store_name(name))
+
+
+def load(name):
+    """Returns the incrementally updated results of a pipeline, or None before its first complete chunk."""
+    return store.load(store_name(name))
+
+
+def update_from_file(name, path, targets_path=None, chunk_size=None):
+    """Feeds a Parquet or CSV file of new analysis rows to :func:`update` one chunk-sized batch at a time.
+
+    Targets are read from ``targets_path`` batch by batch as well, so memory use is bounded by the chunk size rather
+    than by the size of the files. Returns the number of chunks added.
+    """
+    batch_size = _kwargs(PIPELINES[name], chunk_size)['chunk_size']
+    return sum(update(name, batch, chunk_size) for batch in read_batches(path, batch_size, targets_path))
@@ -0,0 +1,181 @@
+"""Records how long the stages of pages and pipelines (loading, fitting, calculating, plotting, ...) take.
+
+    with stage('fit', pipeline='cbpe_census_employment') as record:
+        estimator = nml.CBPE(...).fit(reference_df)
+        record['rows'] = len(reference_df)
+
+Besides its duration, a stage records the peak RSS of the process when it ends, how much it raised that peak, and
+optionally the rows and chunks it handled. Labels passed to a stage (``page``, ``pipeline``, ...) are inherited by the
+stages nested in it, also when these run in worker processes (see :mod:`execution`).
+
+The latest records (``NML_STAGE_RECORDS``, default 1000) are kept in memory, as well as totals per stage and labels
+that can be exported in the Prometheus text format by :func:`prometheus_text`. When ``NML_STAGE_LOG`` is set, each
+record is also appended to that file as a line of JSON.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import deque
+
+_records = deque(maxlen=int(os.environ.get('NML_STAGE_RECORDS', 1000)))
+_totals = {}
+_lock = threading.Lock()
+_labels = contextvars.ContextVar('labels', default={})
+_captured = contextvars.ContextVar('captured', default=None)
+_forwarded = contextvars.ContextVar('forwarded', default=False)
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def labels():
+    """Returns the labels of the stage running in the current thread."""
+    return dict(_labels.get())
+
+
+def add(records):
+    """Adds finished stage records, e.g. the ones returned by a worker process."""
+    with _lock:
+        for record in records:
+            _records.append(record)
+            key = (record['stage'], tuple(sorted(record['labels'].items())))
+            total = _totals.setdefault(key, {
+                'count': 0, 'errors': 0, 'seconds': 0.0, 'peak_rss_mb': 0.0, 'rows': 0, 'chunks': 0,
+            })
+            total['count'] += 1
+            total['errors'] += record['error']
+            total['seconds'] += record['seconds']
+            total['peak_rss_mb'] = max(total['peak_rss_mb'], record['peak_rss_mb'])
+            total['rows'] += record['rows'] or 0
+            total['chunks'] += record['chunks'] or 0
+    captured = _captured.get()
+    if captured is not None:
+        captured.extend(records)
+    path = os.environ.get('NML_STAGE_LOG')
+    if path and not _forwarded.get():
+        with _lock, open(path, 'a') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+
+
+@contextlib.contextmanager
+def capture(labels=None, forward=False):
+    """Runs the block with ``labels`` and collects the records of the stages finished in it into the yielded list.
+
+    With ``forward``, the records are returned to another process, as worker processes do (see :mod:`execution`), and
+    are only written to ``NML_STAGE_LOG`` once that process adds them.
+    """
+    outer = _captured.get()
+    captured = []
+    captured_token = _captured.set(captured)
+    labels_token = _labels.set(dict(labels or {}))
+    forwarded_token = _forwarded.set(forward or _forwarded.get())
+    try:
+        yield captured
+    finally:
+        _forwarded.reset(forwarded_token)
+        _labels.reset(labels_token)
+        _captured.reset(captured_token)
+        if outer is not None:
+            outer.extend(captured)
+
+
+class stage(contextlib.ContextDecorator):
+    """Records a stage, used as a context manager (yielding its record) or as a function decorator."""
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # A decorated function may run in several threads at once, each needs its own record.
+        return stage(self.name, **self.labels)
+
+    def __enter__(self):
+        self.record = {
+            'stage': self.name,
+            'labels': dict(_labels.get(), **self.labels),
+            'started_at': time.time(),
+            'rows': None,
+            'chunks': None,
+        }
+        self._token = _labels.set(self.record['labels'])
+        self._peak_rss_mb = _peak_rss_mb()
+        self._start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.record['seconds'] = time.perf_counter() - self._start
+        self.record['peak_rss_mb'] = _peak_rss_mb()
+        self.record['peak_rss_growth_mb'] = self.record['peak_rss_mb'] - self._peak_rss_mb
+        self.record['error'] = exc_type is not None
+        _labels.reset(self._token)
+        add([self.record])
+        return False
+
+
+def records():
+    """Returns the latest stage records, oldest first."""
+    with _lock:
+        return list(_records)
+
+
+def totals():
+    """Returns ``[{'stage', 'labels', 'count', 'errors', 'seconds', 'peak_rss_mb', 'rows', 'chunks'}]`` per stage and
+    labels, summed over all records since the process started.
+    """
+    with _lock:
+        return [dict(total, stage=name, labels=dict(labels)) for (name, labels), total in _totals.items()]
+
+
+def _format_labels(stage_name, labels):
+    def escape(value):
+        return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+    labels = {'stage': stage_name, **labels}
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+_METRICS = [
+    ('nml_stage_seconds_total', 'counter', 'Time spent in the stage.', 'seconds'),
+    ('nml_stage_runs_total', 'counter', 'Number of times the stage ran.', 'count'),
+    ('nml_stage_errors_total', 'counter', 'Number of times the stage raised an exception.', 'errors'),
+    ('nml_stage_rows_total', 'counter', 'Rows handled by the stage.', 'rows'),
+    ('nml_stage_chunks_total', 'counter', 'Chunks handled by the stage.', 'chunks'),
+    ('nml_stage_peak_rss_megabytes', 'gauge', 'Highest peak RSS of the process at the end of the stage.', 'peak_rss_mb'),
+]
+
+
+def prometheus_text():
+    """Returns the stage totals in the Prometheus text exposition format."""
+    stage_totals = totals()
+    lines = []
+    for metric, metric_type, description, field in _METRICS:
+        lines += [f'# HELP {metric} {description}', f'# TYPE {metric} {metric_type}']
+        lines += [f'{metric}{_format_labels(t["stage"], t["labels"])} {t[field]}' for t in stage_totals]
+    return '\n'.join(lines) + '\n'
+
+
+def sidebar_panel():
+    """Shows the stage records and totals in the sidebar of a page, when enabled with its checkbox."""
+    import pandas as pd
+    import streamlit as st
+
+    if not st.sidebar.checkbox('Show stage timings'):
+        return
+    stage_totals = totals()
+    if not stage_totals:
+        st.sidebar.write('No stages recorded yet.')
+        return
+    table = pd.DataFrame([{'stage': t.pop('stage'), **t.pop('labels'), **t} for t in stage_totals])
+    st.sidebar.dataframe(table.sort_values('seconds', ascending=False), hide_index=True)
+    st.sidebar.download_button('Prometheus metrics', prometheus_text(), file_name='metrics.txt')
+    st.sidebar.download_button('Stage records (JSON lines)', ''.join(json.dumps(r) + '\n' for r in records()),
+                               file_name='stages.jsonl')
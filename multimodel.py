@@ -0,0 +1,346 @@
+"""Performance of many binary classification models sharing a schema, calculated for all of them at once: realized
+performance like ``nml.PerformanceCalculator`` and estimated performance like ``nml.CBPE``.
+
+The reference and analysis data are long-format frames with a ``model_column`` telling the model of each row. They are
+split by model once, and every model is chunked and fitted on its own rows like nannyml does, but the metrics of all
+the chunks of all the models are then calculated together, in vectorized passes over the whole frames grouped by chunk,
+instead of fitting an estimator per model and calculating each metric once per chunk. Only what nannyml fits on the
+data of a model is still fitted per model: the sampling error components of its metrics and the CBPE calibrator.
+
+Supports the ``roc_auc``, ``f1``, ``precision``, ``recall``, ``specificity`` and ``accuracy`` metrics. The results
+match nannyml's, up to floating point rounding, and don't keep the reference and analysis data.
+"""
+import copy
+
+import nannyml as nml
+import numpy as np
+import pandas as pd
+from nannyml._typing import ProblemType
+from nannyml.calibration import needs_calibration
+from nannyml.performance_calculation.result import Result as PerformanceResult
+from nannyml.performance_estimation.confidence_based.results import Result as CBPEResult
+from nannyml.sampling_error import SAMPLING_ERROR_RANGE
+from nannyml.thresholds import calculate_threshold_values
+
+from sketches import chunk_positions, chunk_rows
+
+METRICS = ('roc_auc', 'f1', 'precision', 'recall', 'specificity', 'accuracy')
+
+
+class _Groups:
+    """The chunks of every model in a frame, numbered one model after the other."""
+
+    def __init__(self, chunker, df, model_column, timestamp_column_name, models):
+        rows = df.groupby(model_column, sort=False, observed=True).indices
+        timestamps = df[[timestamp_column_name] if timestamp_column_name else []]
+        # The positions of the rows, the chunks and the range of groups of each model.
+        self.rows, self.chunks, self.ranges = {}, {}, {}
+        # The group of each row, -1 for rows without a chunk.
+        self.groups = np.full(len(df), -1)
+        self.count = 0
+        for model in models:
+            positions = rows.get(model, np.array([], dtype=np.int64))
+            chunks, local = chunk_positions(chunker, timestamps.iloc[positions], timestamp_column_name)
+            self.groups[positions] = np.where(local >= 0, local + self.count, -1)
+            self.rows[model], self.chunks[model] = positions, chunks
+            self.ranges[model] = slice(self.count, self.count + len(chunks))
+            self.count += len(chunks)
+
+
+def _column(df, column_name):
+    if column_name is None or column_name not in df.columns:
+        return np.full(len(df), np.nan)
+    return df[column_name].to_numpy(dtype=float)
+
+
+def _counted(groups, *columns):
+    # Like nannyml, metrics are calculated on the rows having all of their columns.
+    missing = np.zeros(len(groups), dtype=bool)
+    for column in columns:
+        missing |= np.isnan(column)
+    return np.where(missing, -1, groups)
+
+
+def _total(groups, count, weights=None):
+    counted = groups >= 0
+    weights = None if weights is None else weights[counted]
+    return np.bincount(groups[counted], weights, minlength=count).astype(float)
+
+
+def _roc_auc(groups, count, y_true, y_pred_proba):
+    # The Mann-Whitney U statistic of the positives, from the ranks of the scores within each group.
+    counted = groups >= 0
+    ranks = pd.Series(y_pred_proba[counted]).groupby(groups[counted]).rank().to_numpy()
+    positive = y_true[counted] == 1
+    positives = np.bincount(groups[counted][positive], minlength=count)
+    negatives = np.bincount(groups[counted], minlength=count) - positives
+    rank_sums = np.bincount(groups[counted][positive], ranks[positive], minlength=count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = (rank_sums - positives * (positives + 1) / 2) / (positives * negatives)
+    return np.where((positives > 0) & (negatives > 0), values, np.nan)
+
+
+def _realized(metric, groups, count, y_true, y_pred, y_pred_proba):
+    """Returns the realized ``metric`` of each group and the number of rows it is calculated on."""
+    if metric == 'roc_auc':
+        groups = _counted(groups, y_true, y_pred_proba)
+        return _roc_auc(groups, count, y_true, y_pred_proba), _total(groups, count)
+
+    groups = _counted(groups, y_true, y_pred)
+    counted = groups >= 0
+    cells = groups[counted] * 4 + 2 * (y_true[counted] == 1) + (y_pred[counted] == 1)
+    tn, fp, fn, tp = np.bincount(cells, minlength=count * 4).reshape(count, 4).T.astype(float)
+    rows = tn + fp + fn + tp
+    # Like nannyml, these are undefined for chunks with a single class of targets or predictions.
+    both_classes = (tp + fn > 0) & (tn + fp > 0) & (tp + fp > 0) & (tn + fn > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = {
+            'f1': np.where(both_classes, 2 * tp / (2 * tp + fp + fn), np.nan),
+            'precision': np.where(both_classes, tp / (tp + fp), np.nan),
+            'recall': np.where(both_classes, tp / (tp + fn), np.nan),
+            'specificity': np.where(tn + fp > 0, tn / (tn + fp), np.nan),
+            'accuracy': np.where(rows > 0, (tp + tn) / rows, np.nan),
+        }[metric]
+    return values, rows
+
+
+def _estimated_roc_auc(groups, count, calibrated, uncalibrated):
+    # Like nannyml's estimate_roc_auc: the area under the curve of the expected true and false positives, with the
+    # rows of each group by decreasing uncalibrated score.
+    counted = np.flatnonzero(groups >= 0)
+    order = counted[np.lexsort((-uncalibrated[counted], groups[counted]))]
+    chunk_groups = groups[order]
+    cumulative = pd.Series(calibrated[order]).groupby(chunk_groups)
+    tps = cumulative.cumsum().to_numpy()
+    fps = np.round(1 + cumulative.cumcount().to_numpy() - tps, 5)
+    tps = np.round(tps, 5)
+    first = np.r_[True, chunk_groups[1:] != chunk_groups[:-1]]
+    previous_tps, previous_fps = np.r_[0, tps[:-1]], np.r_[0, fps[:-1]]
+    previous_tps[first], previous_fps[first] = 0, 0
+    areas = np.bincount(chunk_groups, (fps - previous_fps) * (tps + previous_tps) / 2, minlength=count)
+    last = np.r_[first[1:], True]
+    tps_total, fps_total = np.zeros(count), np.zeros(count)
+    tps_total[chunk_groups[last]], fps_total[chunk_groups[last]] = tps[last], fps[last]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = areas / (tps_total * fps_total)
+    return np.where((tps_total > 0) & (fps_total > 0), values, np.nan)
+
+
+def _estimated(metric, groups, count, y_pred, calibrated, uncalibrated):
+    """Returns the ``metric`` estimated by CBPE for each group and the number of rows it is estimated on."""
+    if metric == 'roc_auc':
+        groups = _counted(groups, calibrated, uncalibrated)
+        return _estimated_roc_auc(groups, count, calibrated, uncalibrated), _total(groups, count)
+
+    groups = _counted(groups, calibrated, y_pred)
+    # The expected confusion matrix of each group.
+    positive, negative = y_pred == 1, y_pred == 0
+    tp = _total(groups, count, np.where(positive, calibrated, 0))
+    fp = _total(groups, count, np.where(positive, 1 - calibrated, 0))
+    fn = _total(groups, count, np.where(negative, calibrated, 0))
+    tn = _total(groups, count, np.where(negative, 1 - calibrated, 0))
+    rows = _total(groups, count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = {
+            'f1': tp / (tp + 0.5 * (fp + fn)),
+            'precision': tp / (tp + fp),
+            'recall': tp / (tp + fn),
+            'specificity': tn / (tn + fp),
+            'accuracy': (tp + tn) / rows,
+        }[metric]
+    return np.where(rows > 0, values, np.nan), rows
+
+
+def _sampling_error(metric, rows):
+    components = metric._sampling_error_components
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metric.name == 'accuracy':
+            values = components[0] / np.sqrt(rows)
+        else:
+            values = components[0] / np.sqrt(rows * components[1])
+    return np.where(rows > 0, values, np.nan)
+
+
+def _fit_thresholds(metric, reference_values):
+    metric.lower_threshold_value, metric.upper_threshold_value = calculate_threshold_values(
+        threshold=metric.threshold,
+        data=reference_values,
+        lower_threshold_value_limit=metric.lower_threshold_value_limit,
+        upper_threshold_value_limit=metric.upper_threshold_value_limit,
+    )
+
+
+def _alerts(metric, values):
+    alerts = np.zeros(len(values), dtype=bool)
+    with np.errstate(invalid='ignore'):
+        if metric.lower_threshold_value is not None:
+            alerts |= values < metric.lower_threshold_value
+        if metric.upper_threshold_value is not None:
+            alerts |= values > metric.upper_threshold_value
+    return alerts
+
+
+def _check(estimator):
+    if estimator.problem_type != ProblemType.CLASSIFICATION_BINARY:
+        raise ValueError('only binary classification models are supported')
+    unsupported = [metric.name for metric in estimator.metrics if metric.name not in METRICS]
+    if unsupported:
+        raise ValueError(f'the {", ".join(unsupported)} metrics are not supported')
+
+
+def _models(reference_df, analysis_df, model_column):
+    models = list(pd.unique(analysis_df[model_column].dropna()))
+    missing = set(models) - set(pd.unique(reference_df[model_column].dropna()))
+    if missing:
+        raise ValueError(f'no reference data for models {", ".join(sorted(map(str, missing)))}')
+    return models
+
+
+def _split(estimator, reference_df, analysis_df, model_column):
+    models = _models(reference_df, analysis_df, model_column)
+    return models, *(
+        _Groups(estimator.chunker, df, model_column, estimator.timestamp_column_name, models)
+        for df in (reference_df, analysis_df)
+    )
+
+
+def _chunk_data(reference, analysis, model):
+    return {('chunk', name): values for name, values in pd.concat(
+        [chunk_rows(reference.chunks[model], 'reference'), chunk_rows(analysis.chunks[model], 'analysis')],
+        ignore_index=True,
+    ).items()}
+
+
+def _of(reference, analysis, model, reference_values, analysis_values):
+    # The values of the reference and analysis chunks of a model.
+    return np.concatenate([reference_values[reference.ranges[model]], analysis_values[analysis.ranges[model]]])
+
+
+def calculate_performance(reference_df, analysis_df, model_column, **kwargs):
+    """Returns ``{model: result}`` with the results of ``nml.PerformanceCalculator(**kwargs)`` fitted on the reference
+    rows of each model in ``model_column`` and calculated on its analysis rows.
+    """
+    calculator = nml.PerformanceCalculator(**kwargs)
+    _check(calculator)
+    if calculator.y_true not in analysis_df.columns:
+        raise ValueError(f"the analysis data has no '{calculator.y_true}' targets")
+    models, reference, analysis = _split(calculator, reference_df, analysis_df, model_column)
+
+    columns = calculator.y_true, calculator.y_pred, calculator.y_pred_proba
+    reference_columns = [_column(reference_df, column_name) for column_name in columns]
+    analysis_columns = [_column(analysis_df, column_name) for column_name in columns]
+    missing_rates = [
+        _total(groups.groups, groups.count, np.isnan(y_true).astype(float)) / _total(groups.groups, groups.count)
+        for groups, (y_true, _, _) in ((reference, reference_columns), (analysis, analysis_columns))
+    ]
+    calculated = {
+        metric.name: [
+            _realized(metric.name, reference.groups, reference.count, *reference_columns),
+            _realized(metric.name, analysis.groups, analysis.count, *analysis_columns),
+        ]
+        for metric in calculator.metrics
+    }
+
+    fit_data = reference_df[[column_name for column_name in columns if column_name]]
+    results = {}
+    for model in models:
+        model_reference = fit_data.iloc[reference.rows[model]].reset_index(drop=True)
+        data = _chunk_data(reference, analysis, model)
+        data[('chunk', 'targets_missing_rate')] = _of(reference, analysis, model, *missing_rates)
+        metrics = copy.deepcopy(calculator.metrics)
+        for metric in metrics:
+            (reference_values, reference_rows), (analysis_values, analysis_rows) = calculated[metric.name]
+            metric._fit(model_reference)
+            _fit_thresholds(metric, reference_values[reference.ranges[model]])
+            values = _of(reference, analysis, model, reference_values, analysis_values)
+            rows = _of(reference, analysis, model, reference_rows, analysis_rows)
+            data[(metric.column_name, 'sampling_error')] = _sampling_error(metric, rows)
+            data[(metric.column_name, 'value')] = values
+            data[(metric.column_name, 'upper_threshold')] = metric.upper_threshold_value
+            data[(metric.column_name, 'lower_threshold')] = metric.lower_threshold_value
+            data[(metric.column_name, 'alert')] = _alerts(metric, values)
+        results[model] = PerformanceResult(
+            results_data=pd.DataFrame(data),
+            metrics=metrics,
+            y_true=calculator.y_true,
+            y_pred=calculator.y_pred,
+            y_pred_proba=calculator.y_pred_proba,
+            timestamp_column_name=calculator.timestamp_column_name,
+            problem_type=calculator.problem_type,
+        )
+    return results
+
+
+def estimate_performance(reference_df, analysis_df, model_column, **kwargs):
+    """Returns ``{model: result}`` with the results of ``nml.CBPE(**kwargs)`` fitted on the reference rows of each
+    model in ``model_column`` and estimated on its analysis rows.
+    """
+    estimator = nml.CBPE(**kwargs)
+    _check(estimator)
+    models, reference, analysis = _split(estimator, reference_df, analysis_df, model_column)
+
+    columns = estimator.y_true, estimator.y_pred, estimator.y_pred_proba
+    reference_columns = [_column(reference_df, column_name) for column_name in columns]
+    analysis_columns = [_column(analysis_df, column_name) for column_name in columns]
+
+    # Calibrators are fitted per model, like CBPE does when it needs them.
+    fit_data = reference_df[[column_name for column_name in columns if column_name]]
+    calibrated = [reference_columns[2].copy(), analysis_columns[2].copy()]
+    for model in models:
+        model_reference = fit_data.iloc[reference.rows[model]].reset_index(drop=True)
+        y_true, y_pred_proba = model_reference[estimator.y_true], model_reference[estimator.y_pred_proba]
+        calibrator = copy.deepcopy(estimator.calibrator)
+        if needs_calibration(y_true=y_true, y_pred_proba=y_pred_proba, calibrator=calibrator):
+            calibrator.fit(y_pred_proba, y_true)
+            for groups, scores in zip((reference, analysis), calibrated):
+                scores[groups.rows[model]] = calibrator.calibrate(scores[groups.rows[model]])
+
+    calculated = {
+        metric.name: [
+            _estimated(metric.name, groups.groups, groups.count, frame_columns[1], scores, frame_columns[2])
+            + _realized(metric.name, groups.groups, groups.count, *frame_columns)[:1]
+            for groups, frame_columns, scores in zip((reference, analysis), (reference_columns, analysis_columns),
+                                                     calibrated)
+        ]
+        for metric in estimator.metrics
+    }
+
+    results = {}
+    for model in models:
+        model_reference = fit_data.iloc[reference.rows[model]].reset_index(drop=True)
+        data = _chunk_data(reference, analysis, model)
+        metrics = copy.deepcopy(estimator.metrics)
+        for metric in metrics:
+            reference_calculated, analysis_calculated = calculated[metric.name]
+            metric._fit(model_reference)
+            # Thresholds are fitted on the realized performance of the reference chunks.
+            _fit_thresholds(metric, reference_calculated[2][reference.ranges[model]])
+            values, rows, realized = (
+                _of(reference, analysis, model, reference_values, analysis_values)
+                for reference_values, analysis_values in zip(reference_calculated, analysis_calculated)
+            )
+            sampling_error = _sampling_error(metric, rows)
+            upper_limit, lower_limit = metric.upper_threshold_value_limit, metric.lower_threshold_value_limit
+            data[(metric.column_name, 'value')] = values
+            data[(metric.column_name, 'sampling_error')] = sampling_error
+            data[(metric.column_name, 'realized')] = realized
+            data[(metric.column_name, 'upper_confidence_boundary')] = np.minimum(
+                np.inf if upper_limit is None else upper_limit, values + SAMPLING_ERROR_RANGE * sampling_error
+            )
+            data[(metric.column_name, 'lower_confidence_boundary')] = np.maximum(
+                -np.inf if lower_limit is None else lower_limit, values - SAMPLING_ERROR_RANGE * sampling_error
+            )
+            data[(metric.column_name, 'upper_threshold')] = metric.upper_threshold_value
+            data[(metric.column_name, 'lower_threshold')] = metric.lower_threshold_value
+            data[(metric.column_name, 'alert')] = _alerts(metric, values)
+        results[model] = CBPEResult(
+            results_data=pd.DataFrame(data),
+            metrics=metrics,
+            y_pred=estimator.y_pred,
+            y_pred_proba=estimator.y_pred_proba,
+            y_true=estimator.y_true,
+            chunker=estimator.chunker,
+            problem_type=estimator.problem_type,
+            timestamp_column_name=estimator.timestamp_column_name,
+        )
+    return results
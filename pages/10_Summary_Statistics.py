@@ -1,8 +1,12 @@
 import streamlit as st
-import nannyml as nml
+from data import load_dataset
+from pipelines import get_results
+from plots import column_figure, select_columns
+from utils import stage, warmup_status
 
 st.set_page_config(layout="wide")
 st.title('Summary Statistics')
+warmup_status()
 
 st.markdown("""You can use NannyML to calculate summary statistcs of your data. There are five summary statistics available:
 - Summation
@@ -16,25 +20,21 @@ st.write('Source: https://nannyml.readthedocs.io/en/stable/tutorials/summary_sta
 
 st.header('Example')
 
-reference_df, analysis_df, analysis_targets_df = nml.load_synthetic_car_loan_dataset()
+with st.spinner('Loading data'), stage('load'):
+    reference_df, analysis_df, analysis_targets_df = load_dataset('car_loan')
 st.subheader('Reference')
 st.write(reference_df.head())
 
-feature_column_names = [
-    'car_value', 'debt_to_income_ratio', 'driver_tenure'
-]
-calc = nml.SummaryStatsSumCalculator(
-    column_names=feature_column_names,
-)
-
-calc.fit(reference_df)
-results = calc.calculate(analysis_df)
+with stage('results'):
+    results = get_results('summary_sum_car_loan')
 st.subheader('Summary results')
 st.write(results.filter(period='all').to_df())
 
 st.subheader('Summary results for each column')
-for column_name in results.column_names:
-    st.plotly_chart(results.filter(column_names=column_name).plot())
+column_names = select_columns(results.column_names, key='summary_sum')
+with stage('plot'):
+    for column_name in column_names:
+        st.plotly_chart(column_figure('summary_sum_car_loan', results, column_name))
 
 from utils import display_source_code
-display_source_code()
+display_source_code('summary_sum_car_loan')
@@ -1,8 +1,12 @@
 import streamlit as st
-import nannyml as nml
+from data import load_dataset
+from pipelines import get_results
+from plots import limit, select_window
+from utils import stage, warmup_status
 
 st.set_page_config(layout="wide")
 st.title('Confidence Based Performance Estimation (CBPE)')
+warmup_status()
 
 st.markdown("""
 - Used for binary and multiclass classification problems
@@ -14,9 +18,9 @@ st.write('Source: https://nannyml.readthedocs.io/en/stable/how_it_works/performa
 
 st.header('Example')
 
-with st.spinner('Loading data'):
+with st.spinner('Loading data'), stage('load'):
     # Load real-world data:
-    reference_df, analysis_df, _ = nml.load_us_census_ma_employment_data()
+    reference_df, analysis_df, _ = load_dataset('census_employment')
 
 st.subheader('Reference')
 st.write(reference_df.head())
@@ -25,23 +29,13 @@ st.subheader('Analysis')
 st.write(analysis_df.head())
 
 st.subheader('Estimated performance')
-with st.spinner('Estimating performance'):
-    # Choose a chunker or set a chunk size:
-    chunk_size = 5000
-
-    # initialize, specify required data columns, fit estimator and estimate:
-    estimator = nml.CBPE(
-        problem_type='classification_binary',
-        y_pred_proba='predicted_probability',
-        y_pred='prediction',
-        y_true='employed',
-        metrics=['roc_auc'],
-        chunk_size=chunk_size,
-    )
-    estimator = estimator.fit(reference_df)
-    estimated_performance = estimator.estimate(analysis_df)
-
-st.plotly_chart(estimated_performance.plot())
+with st.spinner('Estimating performance'), stage('results'):
+    # fitted and estimated once, then read from the results store (see the pipeline source code below):
+    estimated_performance = get_results('cbpe_census_employment')
+
+window = select_window(estimated_performance, key='cbpe_window')
+with stage('plot'):
+    st.plotly_chart(limit(estimated_performance, window).plot())
 
 from utils import display_source_code
-display_source_code()
+display_source_code('cbpe_census_employment')
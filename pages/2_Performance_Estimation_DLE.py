@@ -1,8 +1,12 @@
 import streamlit as st
-import nannyml as nml
+from data import load_dataset
+from pipelines import get_results
+from plots import limit, select_window
+from utils import stage, warmup_status
 
 st.set_page_config(layout="wide")
 st.title('Direct Loss Estimation (DLE)')
+warmup_status()
 
 st.markdown("""
 - Used for regression tasks
@@ -16,9 +20,9 @@ st.write('Source: https://nannyml.readthedocs.io/en/stable/how_it_works/performa
 
 st.header('Example')
 
-with st.spinner('Loading data'):
+with st.spinner('Loading data'), stage('load'):
     # Load real-world data:
-    reference_df, analysis_df, _ = nml.load_synthetic_car_price_dataset()
+    reference_df, analysis_df, _ = load_dataset('car_price')
 
 st.subheader('Reference')
 st.write(reference_df.head())
@@ -27,24 +31,13 @@ st.subheader('Analysis')
 st.write(analysis_df.head())
 
 st.subheader('Estimated performance')
-with st.spinner('Estimating performance'):
-    # Choose a chunker or set a chunk size:
-    chunk_size = 5000
-
-    # initialize, specify required data columns, fit estimator and estimate:
-    estimator = nml.DLE(
-        feature_column_names=['car_age', 'km_driven', 'price_new', 'accident_count', 'door_count', 'fuel', 'transmission'],
-        y_pred='y_pred',
-        y_true='y_true',
-        timestamp_column_name='timestamp',
-        metrics=['rmse', 'rmsle'],
-        chunk_size=6000,
-        tune_hyperparameters=False
-    )
-    estimator = estimator.fit(reference_df)
-    estimated_performance = estimator.estimate(analysis_df)
-
-st.plotly_chart(estimated_performance.plot())
+with st.spinner('Estimating performance'), stage('results'):
+    # fitted and estimated once, then read from the results store (see the pipeline source code below):
+    estimated_performance = get_results('dle_car_price')
+
+window = select_window(estimated_performance, key='dle_window')
+with stage('plot'):
+    st.plotly_chart(limit(estimated_performance, window).plot())
 
 from utils import display_source_code
-display_source_code()
+display_source_code('dle_car_price')
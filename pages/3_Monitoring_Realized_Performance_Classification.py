@@ -1,8 +1,12 @@
 import streamlit as st
-import nannyml as nml
+from data import join_targets, load_dataset
+from pipelines import get_results_parallel
+from plots import limit, select_window
+from utils import stage, warmup_status
 
 st.set_page_config(layout="wide")
 st.title('Monitoring Realized Performance - Classification')
+warmup_status()
 st.write('The realized performance of a machine learning model is typically a good proxy for the business impact of the model. A significant drop in performance normally means a lot of value generated by the model is at risk, so close monitoring and quick resolution of issues are essential.')
 
 st.subheader('Estimated vs realized performance')
@@ -23,9 +27,9 @@ st.write('Source: https://nannyml.readthedocs.io/en/stable/tutorials/performance
 
 st.header('Example')
 
-with st.spinner('Loading data'):
-    reference_df, analysis_df, analysis_targets_df = nml.load_synthetic_car_loan_dataset()
-    analysis_df = analysis_df.merge(analysis_targets_df, left_index=True, right_index=True)
+with st.spinner('Loading data'), stage('load'):
+    reference_df, analysis_df, analysis_targets_df = load_dataset('car_loan')
+    analysis_df = join_targets(analysis_df, analysis_targets_df)
 
 st.subheader('Reference')
 st.write(reference_df.head())
@@ -33,37 +37,21 @@ st.write(reference_df.head())
 st.subheader('Analysis')
 st.write(analysis_df.head())
 
+with st.spinner('Calculating performance and business value'), stage('results'):
+    # both calculators are independent, so they run in parallel
+    results, business_value_results = get_results_parallel('performance_car_loan', 'business_value_car_loan')
+
 st.subheader('Realized performance')
-with st.spinner('Calculating performance'):
-    calc = nml.PerformanceCalculator(
-        y_pred_proba='y_pred_proba',
-        y_pred='y_pred',
-        y_true='repaid',
-        timestamp_column_name='timestamp',
-        problem_type='classification_binary',
-        metrics=['roc_auc', 'f1', 'precision', 'recall'],
-        chunk_size=5000)
-    calc.fit(reference_df)
-    results = calc.calculate(analysis_df)
-st.plotly_chart(results.plot())
+window = select_window(results, key='performance_window')
+with stage('plot'):
+    st.plotly_chart(limit(results, window).plot())
 
 st.subheader('Estimated business value')
-with st.spinner('Calculating business value'):
-    calc = nml.PerformanceCalculator(
-        y_pred_proba='y_pred_proba',
-        y_pred='y_pred',
-        y_true='repaid',
-        timestamp_column_name='timestamp',
-        problem_type='classification_binary',
-        metrics=['business_value'],
-        # [value_of_TN, value_of_FP], [value_of_FN, value_of_TP]]
-        business_value_matrix=[[0, -200], [-100, 1000]],
-    )
-    calc.fit(reference_df)
-    results = calc.calculate(analysis_df)
-st.plotly_chart(results.plot())
+window = select_window(business_value_results, key='business_value_window')
+with stage('plot'):
+    st.plotly_chart(limit(business_value_results, window).plot())
 st.write('https://nannyml.readthedocs.io/en/stable/how_it_works/business_value.html')
 st.write('https://nannyml.readthedocs.io/en/stable/tutorials/performance_calculation/binary_performance_calculation/business_value_calculation.html')
 
 from utils import display_source_code
-display_source_code()
+display_source_code('performance_car_loan', 'business_value_car_loan')
@@ -1,16 +1,20 @@
 import streamlit as st
-import nannyml as nml
+from data import join_targets, load_dataset
+from pipelines import get_results
+from plots import limit, select_window
+from utils import stage, warmup_status
 
 st.set_page_config(layout="wide")
 st.title('Monitoring Realized Performance - Regression')
+warmup_status()
 
 st.write('Source: https://nannyml.readthedocs.io/en/stable/tutorials/performance_calculation/regression_performance_calculation.html')
 
 st.header('Example')
 
-with st.spinner('Loading data'):
-    reference_df, analysis_df, analysis_targets_df = nml.load_synthetic_car_price_dataset()
-    analysis_df = analysis_df.merge(analysis_targets_df, left_index=True, right_index=True)
+with st.spinner('Loading data'), stage('load'):
+    reference_df, analysis_df, analysis_targets_df = load_dataset('car_price')
+    analysis_df = join_targets(analysis_df, analysis_targets_df)
 
 st.subheader('Reference')
 st.write(reference_df.head())
@@ -19,17 +23,11 @@ st.subheader('Analysis')
 st.write(analysis_df.head())
 
 st.subheader('Realized performance')
-with st.spinner('Calculating performance'):
-    calc = nml.PerformanceCalculator(
-        y_pred='y_pred',
-        y_true='y_true',
-        timestamp_column_name='timestamp',
-        problem_type='regression',
-        metrics=['mae', 'mse', 'rmse'],
-        chunk_size=6000)
-    calc.fit(reference_df)
-    results = calc.calculate(analysis_df)
-st.plotly_chart(results.plot())
+with st.spinner('Calculating performance'), stage('results'):
+    results = get_results('performance_car_price')
+window = select_window(results, key='performance_window')
+with stage('plot'):
+    st.plotly_chart(limit(results, window).plot())
 
 from utils import display_source_code
-display_source_code()
+display_source_code('performance_car_price')
@@ -1,16 +1,19 @@
 import streamlit as st
-import nannyml as nml
+from data import load_dataset
+from pipelines import get_results_parallel
+from plots import limit_all, select_window
+from utils import stage, warmup_status
 
 st.set_page_config(layout="wide")
 st.title('Comparing Estimated and Realized Performance')
+warmup_status()
 
 st.write('Source: https://nannyml.readthedocs.io/en/stable/tutorials/compare_estimated_and_realized_performance.html')
 
 st.header('Example')
 
-with st.spinner('Loading data'):
-    reference_df, analysis_df, analysis_targets_df = nml.load_synthetic_car_loan_dataset()
-    analysis_with_targets = analysis_df.merge(analysis_targets_df, left_index=True, right_index=True)
+with st.spinner('Loading data'), stage('load'):
+    reference_df, analysis_df, analysis_targets_df = load_dataset('car_loan')
 
 st.subheader('Reference')
 st.write(reference_df.head())
@@ -19,34 +22,17 @@ st.subheader('Analysis')
 st.write(analysis_df.head())
 
 st.subheader('Estimated vs calculated performance')
-with st.spinner('Estimating performance'):
-    estimator = nml.CBPE(
-        y_pred_proba='y_pred_proba',
-        y_pred='y_pred',
-        y_true='repaid',
-        timestamp_column_name='timestamp',
-        metrics=['roc_auc', 'f1'],
-        chunk_size=5000,
-        problem_type='classification_binary',
-    )
-    estimator.fit(reference_df)
-    results = estimator.estimate(analysis_df)
-
-with st.spinner('Calculating performance'):
-    calculator = nml.PerformanceCalculator(
-        y_pred_proba='y_pred_proba',
-        y_pred='y_pred',
-        y_true='repaid',
-        timestamp_column_name='timestamp',
-        metrics=['roc_auc', 'f1'],
-        chunk_size=5000,
-        problem_type='classification_binary',
-    ).fit(reference_df)
-    realized_results = calculator.calculate(analysis_with_targets)
+with st.spinner('Estimating and calculating performance'), stage('results'):
+    # the estimator and the calculator are independent, so they run in parallel
+    results, realized_results = get_results_parallel('comparison_cbpe_car_loan', 'comparison_performance_car_loan')
 
 # Show comparison plots
-st.plotly_chart(results.filter(metrics=['roc_auc']).compare(realized_results.filter(metrics=['roc_auc'])).plot())
-st.plotly_chart(results.filter(metrics=['f1']).compare(realized_results.filter(metrics=['f1'])).plot())
+window = select_window(results, key='comparison_window')
+with stage('plot'):
+    for metric in ['roc_auc', 'f1']:
+        # both results are limited to the same chunks, so they can be compared
+        estimated, realized = limit_all([results.filter(metrics=[metric]), realized_results.filter(metrics=[metric])], window)
+        st.plotly_chart(estimated.compare(realized).plot())
 
 from utils import display_source_code
-display_source_code()
+display_source_code('comparison_cbpe_car_loan', 'comparison_performance_car_loan')
@@ -1,8 +1,12 @@
 import streamlit as st
-import nannyml as nml
+from data import load_dataset
+from pipelines import get_results
+from plots import column_figure, select_columns, select_window
+from utils import stage, warmup_status
 
 st.set_page_config(layout="wide")
 st.title('Univariate Drift Detection')
+warmup_status()
 
 st.write('Univariate Drift Detection looks at each feature individually and checks whether its distribution has changed compared to reference data. There are many ways to compare two data samples and measure their similarity. NannyML provides several drift detection methods so that users can choose the one that suits their data best or the one they are familiar with. Additionally, more than one method can be used together to gain different perspectives on how the distribution of your data is changing.')
 
@@ -20,8 +24,8 @@ st.markdown("""Source:
 
 st.header('Example')
 
-reference_df, analysis_df, _ = nml.load_synthetic_car_loan_dataset()
-column_names = ['car_value', 'salary_range', 'debt_to_income_ratio', 'loan_length']
+with st.spinner('Loading data'), stage('load'):
+    reference_df, analysis_df, _ = load_dataset('car_loan')
 
 st.subheader('Reference')
 st.write(reference_df.head())
@@ -30,21 +34,21 @@ st.subheader('Analysis')
 st.write(analysis_df.head())
 
 with st.spinner('Calculating drift'):
-    calc = nml.UnivariateDriftCalculator(
-        column_names=column_names,
-        treat_as_categorical=['y_pred'],
-        timestamp_column_name='timestamp',
-        continuous_methods=['kolmogorov_smirnov', 'jensen_shannon'],
-        categorical_methods=['chi2', 'jensen_shannon'],
-    )
-    calc.fit(reference_df)
-    results = calc.calculate(analysis_df)
+    with stage('results'):
+        results = get_results('univariate_drift_car_loan')
 
     st.subheader('Plots')
-    st.plotly_chart(results.filter(column_names=results.continuous_column_names, methods=['jensen_shannon']).plot(kind='drift'))
-    st.plotly_chart(results.filter(column_names=results.categorical_column_names, methods=['chi2']).plot(kind='drift'))
-    st.plotly_chart(results.filter(column_names=results.continuous_column_names, methods=['jensen_shannon']).plot(kind='distribution'))
-    st.plotly_chart(results.filter(column_names=results.categorical_column_names, methods=['chi2']).plot(kind='distribution'))
+    column_names = select_columns(results.column_names, key='univariate_drift')
+    window = select_window(results, key='univariate_drift_window')
+    with stage('plot'):
+        for column_name in column_names:
+            # Jensen-Shannon distance for continuous columns, chi2 for categorical ones
+            methods = ['jensen_shannon'] if column_name in results.continuous_column_names else ['chi2']
+            drift_column, distribution_column = st.columns(2)
+            with drift_column:
+                st.plotly_chart(column_figure('univariate_drift_car_loan', results, column_name, methods, kind='drift', window=window))
+            with distribution_column:
+                st.plotly_chart(column_figure('univariate_drift_car_loan', results, column_name, methods, kind='distribution'))
 
 from utils import display_source_code
-display_source_code()
+display_source_code('univariate_drift_car_loan')
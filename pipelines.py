@@ -0,0 +1,478 @@
+import hashlib
+import json
+import threading
+
+import execution
+import store
+from data import categoricals_as_objects, file_signature, join_targets, load_dataset, load_files
+from fitting import config_key, fingerprint, fit
+from instrumentation import stage
+
+# Every fit/calculate step shown in the pages. Each entry fits `estimator` on the reference data of
+# `dataset` and runs it on the analysis data, joined with the analysis targets when `targets` is set.
+# Instead of a bundled `dataset`, pipelines run by batch.py can read `reference_path`, `analysis_path`
+# and `analysis_targets_path` files. UnivariateDriftCalculator pipelines with `sketch_bins` are
+# approximated from sketches with that many bins per continuous column, see sketches.py.
+PIPELINES = {
+    'cbpe_census_employment': {
+        'page': '1_Performance_Estimation_CBPE',
+        'dataset': 'census_employment',
+        'estimator': 'CBPE',
+        'kwargs': {
+            'problem_type': 'classification_binary',
+            'y_pred_proba': 'predicted_probability',
+            'y_pred': 'prediction',
+            'y_true': 'employed',
+            'metrics': ['roc_auc'],
+            'chunk_size': 5000,
+        },
+    },
+    'dle_car_price': {
+        'page': '2_Performance_Estimation_DLE',
+        'dataset': 'car_price',
+        'estimator': 'DLE',
+        'kwargs': {
+            'feature_column_names': [
+                'car_age', 'km_driven', 'price_new', 'accident_count', 'door_count', 'fuel', 'transmission'
+            ],
+            'y_pred': 'y_pred',
+            'y_true': 'y_true',
+            'timestamp_column_name': 'timestamp',
+            'metrics': ['rmse', 'rmsle'],
+            'chunk_size': 6000,
+            'tune_hyperparameters': False,
+        },
+    },
+    'performance_car_loan': {
+        'page': '3_Monitoring_Realized_Performance_Classification',
+        'dataset': 'car_loan',
+        'targets': True,
+        'estimator': 'PerformanceCalculator',
+        'kwargs': {
+            'y_pred_proba': 'y_pred_proba',
+            'y_pred': 'y_pred',
+            'y_true': 'repaid',
+            'timestamp_column_name': 'timestamp',
+            'problem_type': 'classification_binary',
+            'metrics': ['roc_auc', 'f1', 'precision', 'recall'],
+            'chunk_size': 5000,
+        },
+    },
+    'business_value_car_loan': {
+        'page': '3_Monitoring_Realized_Performance_Classification',
+        'dataset': 'car_loan',
+        'targets': True,
+        'estimator': 'PerformanceCalculator',
+        'kwargs': {
+            'y_pred_proba': 'y_pred_proba',
+            'y_pred': 'y_pred',
+            'y_true': 'repaid',
+            'timestamp_column_name': 'timestamp',
+            'problem_type': 'classification_binary',
+            'metrics': ['business_value'],
+            # [value_of_TN, value_of_FP], [value_of_FN, value_of_TP]]
+            'business_value_matrix': [[0, -200], [-100, 1000]],
+        },
+    },
+    'performance_car_price': {
+        'page': '4_Monitoring_Realized_Performance_Regression',
+        'dataset': 'car_price',
+        'targets': True,
+        'estimator': 'PerformanceCalculator',
+        'kwargs': {
+            'y_pred': 'y_pred',
+            'y_true': 'y_true',
+            'timestamp_column_name': 'timestamp',
+            'problem_type': 'regression',
+            'metrics': ['mae', 'mse', 'rmse'],
+            'chunk_size': 6000,
+        },
+    },
+    'comparison_cbpe_car_loan': {
+        'page': '5_Comparing_Estimated_and_Realized_Performance',
+        'dataset': 'car_loan',
+        'estimator': 'CBPE',
+        'kwargs': {
+            'y_pred_proba': 'y_pred_proba',
+            'y_pred': 'y_pred',
+            'y_true': 'repaid',
+            'timestamp_column_name': 'timestamp',
+            'metrics': ['roc_auc', 'f1'],
+            'chunk_size': 5000,
+            'problem_type': 'classification_binary',
+        },
+    },
+    'comparison_performance_car_loan': {
+        'page': '5_Comparing_Estimated_and_Realized_Performance',
+        'dataset': 'car_loan',
+        'targets': True,
+        'estimator': 'PerformanceCalculator',
+        'kwargs': {
+            'y_pred_proba': 'y_pred_proba',
+            'y_pred': 'y_pred',
+            'y_true': 'repaid',
+            'timestamp_column_name': 'timestamp',
+            'metrics': ['roc_auc', 'f1'],
+            'chunk_size': 5000,
+            'problem_type': 'classification_binary',
+        },
+    },
+    'univariate_drift_car_loan': {
+        'page': '6_Univariate_Drift_Detection',
+        'dataset': 'car_loan',
+        'estimator': 'UnivariateDriftCalculator',
+        'kwargs': {
+            'column_names': ['car_value', 'salary_range', 'debt_to_income_ratio', 'loan_length'],
+            'treat_as_categorical': ['y_pred'],
+            'timestamp_column_name': 'timestamp',
+            'continuous_methods': ['kolmogorov_smirnov', 'jensen_shannon'],
+            'categorical_methods': ['chi2', 'jensen_shannon'],
+            'chunk_size': 5000,
+        },
+    },
+    'multivariate_drift_car_loan': {
+        'page': '7_Multivariate_Drift_Detection',
+        'dataset': 'car_loan',
+        'estimator': 'DataReconstructionDriftCalculator',
+        'kwargs': {
+            'column_names': [
+                'car_value',
+                'salary_range',
+                'debt_to_income_ratio',
+                'loan_length',
+                'repaid_loan_on_prev_car',
+                'size_of_downpayment',
+                'driver_tenure',
+            ],
+            'timestamp_column_name': 'timestamp',
+            'chunk_size': 5000,
+        },
+    },
+    'ranking_univariate_drift_car_loan': {
+        'page': '8_Ranking',
+        'dataset': 'car_loan',
+        'targets': True,
+        'estimator': 'UnivariateDriftCalculator',
+        'kwargs': {
+            'column_names': [
+                'car_value', 'salary_range', 'debt_to_income_ratio', 'loan_length', 'repaid_loan_on_prev_car',
+                'size_of_downpayment', 'driver_tenure', 'y_pred_proba', 'y_pred', 'repaid'
+            ],
+            'treat_as_categorical': ['y_pred', 'repaid'],
+            'timestamp_column_name': 'timestamp',
+            'continuous_methods': ['kolmogorov_smirnov', 'jensen_shannon'],
+            'categorical_methods': ['chi2', 'jensen_shannon'],
+            'chunk_size': 5000,
+        },
+    },
+    'ranking_cbpe_car_loan': {
+        'page': '8_Ranking',
+        'dataset': 'car_loan',
+        'targets': True,
+        'estimator': 'CBPE',
+        'kwargs': {
+            'y_pred_proba': 'y_pred_proba',
+            'y_pred': 'y_pred',
+            'y_true': 'repaid',
+            'timestamp_column_name': 'timestamp',
+            'metrics': ['roc_auc', 'recall'],
+            'chunk_size': 5000,
+            'problem_type': 'classification_binary',
+        },
+    },
+    'ranking_performance_car_loan': {
+        'page': '8_Ranking',
+        'dataset': 'car_loan',
+        'targets': True,
+        'estimator': 'PerformanceCalculator',
+        'kwargs': {
+            'y_pred_proba': 'y_pred_proba',
+            'y_pred': 'y_pred',
+            'y_true': 'repaid',
+            'timestamp_column_name': 'timestamp',
+            'problem_type': 'classification_binary',
+            'metrics': ['roc_auc', 'recall'],
+            'chunk_size': 5000,
+        },
+    },
+    'missing_values_titanic': {
+        'page': '9_Data_Quality_Checks',
+        'dataset': 'titanic',
+        'estimator': 'MissingValuesCalculator',
+        'kwargs': {
+            'column_names': ['Pclass', 'Name', 'Sex', 'Age', 'SibSp', 'Parch', 'Ticket', 'Fare', 'Cabin', 'Embarked'],
+        },
+    },
+    'unseen_values_titanic': {
+        'page': '9_Data_Quality_Checks',
+        'dataset': 'titanic',
+        'estimator': 'UnseenValuesCalculator',
+        'kwargs': {
+            'column_names': ['Sex', 'Ticket', 'Cabin', 'Embarked'],
+        },
+    },
+    'summary_sum_car_loan': {
+        'page': '10_Summary_Statistics',
+        'dataset': 'car_loan',
+        'estimator': 'SummaryStatsSumCalculator',
+        'kwargs': {
+            'column_names': ['car_value', 'debt_to_income_ratio', 'driver_tenure'],
+        },
+    },
+}
+
+# Estimators fitting scikit-learn imputers on categorical columns, which fail on pandas categoricals.
+OBJECT_CATEGORICALS = {'DataReconstructionDriftCalculator'}
+
+# Arguments of UnivariateDriftCalculator selecting what it calculates. Pipelines on the same dataset that differ only
+# in these are calculated once, for the union of their columns and methods, see _shared_drift_pipelines.
+DRIFT_SELECTIONS = (
+    'column_names', 'treat_as_categorical', 'treat_as_continuous', 'continuous_methods', 'categorical_methods'
+)
+
+
+def _union(lists):
+    return list(dict.fromkeys(item for items in lists for item in items or ()))
+
+
+def _treatment(kwargs, column_name):
+    if column_name in (kwargs.get('treat_as_categorical') or ()):
+        return 'categorical'
+    if column_name in (kwargs.get('treat_as_continuous') or ()):
+        return 'continuous'
+    return None
+
+
+def _shared_drift_pipeline(names, pipelines):
+    members = [pipelines[name]['kwargs'] for name in names]
+    kwargs = {key: value for key, value in members[0].items() if key not in DRIFT_SELECTIONS}
+    for key in DRIFT_SELECTIONS:
+        if any(member.get(key) for member in members):
+            kwargs[key] = _union(member.get(key) for member in members)
+    # Sharing mustn't change how a column is treated, nor the methods of a pipeline relying on the defaults.
+    for member in members:
+        if not member.get('continuous_methods') or not member.get('categorical_methods'):
+            return None
+        if any(_treatment(member, c) != _treatment(kwargs, c) for c in member['column_names']):
+            return None
+    pipeline = {
+        'dataset': pipelines[names[0]]['dataset'],
+        'targets': any(pipelines[name].get('targets') for name in names),
+        'estimator': 'UnivariateDriftCalculator',
+        'kwargs': kwargs,
+        'members': names,
+    }
+    if pipelines[names[0]].get('sketch_bins'):
+        pipeline['sketch_bins'] = pipelines[names[0]]['sketch_bins']
+    return pipeline
+
+
+def _shared_drift_pipelines(pipelines):
+    """Returns ``{name: (shared name, shared pipeline)}`` for the univariate drift pipelines calculated together."""
+    groups = {}
+    for name, pipeline in pipelines.items():
+        if pipeline['estimator'] != 'UnivariateDriftCalculator' or 'dataset' not in pipeline:
+            continue
+        common = {key: value for key, value in pipeline['kwargs'].items() if key not in DRIFT_SELECTIONS}
+        group = json.dumps([pipeline['dataset'], common, pipeline.get('sketch_bins')], sort_keys=True, default=repr)
+        groups.setdefault(group, []).append(name)
+
+    shared = {}
+    for group, names in groups.items():
+        pipeline = _shared_drift_pipeline(names, pipelines) if len(names) > 1 else None
+        if pipeline is not None:
+            digest = hashlib.sha256(group.encode()).hexdigest()[:8]
+            shared_name = f"shared_univariate_drift_{pipeline['dataset']}_{digest}"
+            shared.update((name, (shared_name, pipeline)) for name in names)
+    return shared
+
+
+SHARED = _shared_drift_pipelines(PIPELINES)
+
+_locks = {name: threading.Lock() for name in list(PIPELINES) + [shared_name for shared_name, _ in SHARED.values()]}
+
+
+def _frames(pipeline):
+    if 'dataset' in pipeline:
+        return load_dataset(pipeline['dataset'])
+    return load_files(pipeline['reference_path'], pipeline['analysis_path'], pipeline.get('analysis_targets_path'))
+
+
+def estimator_class(pipeline):
+    # nannyml takes seconds to import, so it is only imported once a pipeline runs.
+    import nannyml as nml
+
+    return getattr(nml, pipeline['estimator'])
+
+
+def load_data(pipeline):
+    reference_df, analysis_df, analysis_targets_df = _frames(pipeline)
+    if pipeline.get('targets'):
+        if analysis_targets_df is None:
+            raise ValueError('pipelines with targets need an analysis_targets_path')
+        analysis_df = join_targets(analysis_df, analysis_targets_df)
+    if pipeline['estimator'] in OBJECT_CATEGORICALS:
+        reference_df, analysis_df = categoricals_as_objects(reference_df), categoricals_as_objects(analysis_df)
+    return reference_df, analysis_df
+
+
+def inputs_key(pipeline):
+    """Identifies everything a pipeline result depends on: its configuration, the content of its data and the version of
+    nannyml calculating it."""
+    import nannyml as nml
+
+    source = [config_key(estimator_class(pipeline), pipeline['kwargs']), bool(pipeline.get('targets')), nml.__version__]
+    if pipeline.get('sketch_bins'):
+        source.append({'sketch_bins': pipeline['sketch_bins']})
+    if 'dataset' in pipeline:
+        source += [fingerprint(df) for df in load_dataset(pipeline['dataset'])]
+    else:
+        paths = [pipeline['reference_path'], pipeline['analysis_path'], pipeline.get('analysis_targets_path')]
+        source += [file_signature(path) if path else None for path in paths]
+    return hashlib.sha256(json.dumps(source).encode()).hexdigest()
+
+
+def compute(pipeline, reference_df, analysis_df):
+    if pipeline['estimator'] == 'UnivariateDriftCalculator' and pipeline.get('sketch_bins'):
+        from sketches import calculate_univariate_drift
+
+        kwargs = dict(pipeline['kwargs'])
+        with stage('sketch_calculate') as record:
+            result = calculate_univariate_drift(
+                reference_df, analysis_df, kwargs.pop('column_names'), bins=pipeline['sketch_bins'], **kwargs
+            )
+            record.update(rows=len(reference_df) + len(analysis_df), chunks=len(result.data))
+        return result
+
+    if pipeline['estimator'] == 'UnivariateDriftCalculator' and execution.max_workers() > 1:
+        from drift import calculate_univariate_drift
+
+        kwargs = dict(pipeline['kwargs'])
+        with stage('fit_calculate') as record:
+            result = calculate_univariate_drift(reference_df, analysis_df, kwargs.pop('column_names'), **kwargs)
+            record.update(rows=len(reference_df) + len(analysis_df), chunks=len(result.data))
+        return result
+
+    with stage('fit') as record:
+        estimator = fit(estimator_class(pipeline), reference_df, **pipeline['kwargs'])
+        record['rows'] = len(reference_df)
+    method = 'estimate' if hasattr(estimator, 'estimate') else 'calculate'
+    with stage(method) as record:
+        result = getattr(estimator, method)(analysis_df)
+        record.update(rows=len(analysis_df), chunks=len(result.data))
+    return result
+
+
+def _source(name):
+    # The pipeline whose stored results contain the results of pipeline `name`.
+    return SHARED.get(name, (name, PIPELINES[name]))
+
+
+def _view(name, result):
+    """Returns the results of pipeline ``name`` out of the results of its source pipeline, see :data:`SHARED`."""
+    if name not in SHARED:
+        return result
+    kwargs = PIPELINES[name]['kwargs']
+    shared_kwargs = SHARED[name][1]['kwargs']
+    column_names = kwargs['column_names']
+    if all(kwargs[key] == shared_kwargs[key] for key in ('continuous_methods', 'categorical_methods')):
+        return result.filter(column_names=column_names)
+
+    from drift import merge_results
+
+    continuous = [c for c in column_names if c in result.continuous_column_names]
+    categorical = [c for c in column_names if c in result.categorical_column_names]
+    views = []
+    if continuous:
+        views.append(result.filter(column_names=continuous, methods=kwargs['continuous_methods']))
+    if categorical:
+        views.append(result.filter(column_names=categorical, methods=kwargs['categorical_methods']))
+    merged = merge_results(views, column_names, kwargs['continuous_methods'], kwargs['categorical_methods'])
+    # The calculator of the pipeline lays out its results by filtering them with its own columns and methods.
+    return merged.filter(column_names=column_names, methods=kwargs['continuous_methods'] + kwargs['categorical_methods'])
+
+
+def _stored(name, pipeline, manifest):
+    return manifest.get(name, {}).get('key') == inputs_key(pipeline)
+
+
+def get_results(name, pipeline=None):
+    """Returns the stored results of a pipeline, computing and storing them first when its inputs changed.
+
+    ``pipeline`` configures pipelines that aren't in ``PIPELINES``, see batch.py. Pipelines calculated together with
+    others (see :data:`SHARED`) get their part of the shared results.
+    """
+    if pipeline is None and name in SHARED:
+        return _view(name, get_results(*SHARED[name]))
+    pipeline = pipeline or PIPELINES[name]
+    key = inputs_key(pipeline)
+    with _locks.setdefault(name, threading.Lock()), stage('pipeline', pipeline=name) as record:
+        with stage('store_load'):
+            result = store.load(name, key)
+        if result is None:
+            result = compute(pipeline, *load_data(pipeline))
+            with stage('store_save'):
+                store.save(name, key, result)
+        record['chunks'] = len(result.data)
+    return result
+
+
+def get_results_in_worker(name):
+    """Computes and stores the results of a pipeline in a worker process, unless they are already stored.
+
+    Other threads asking for the pipeline meanwhile wait for the worker and then read its results from the store.
+    """
+    if execution.max_workers() == 1:
+        get_results(name)
+        return
+    source_name, source_pipeline = _source(name)
+    if _stored(source_name, source_pipeline, store.manifest()):
+        return
+    with _locks[source_name]:
+        # Another pipeline sharing these results may have computed them meanwhile.
+        if _stored(source_name, source_pipeline, store.manifest()):
+            return
+        job = execution.run({source_name: (get_results, source_name, source_pipeline)})[source_name]
+    if job.error is not None:
+        raise job.error
+
+
+def get_results_parallel(*names):
+    """Returns the results of several pipelines, computing the ones missing from the store in parallel processes."""
+    manifest = store.manifest()
+    sources = dict(_source(name) for name in names)
+    # Pipelines being computed by get_results_in_worker are waited for by get_results instead.
+    missing = {
+        source_name: (get_results, source_name, source_pipeline) for source_name, source_pipeline in sources.items()
+        if not _stored(source_name, source_pipeline, manifest) and not _locks[source_name].locked()
+    }
+    computed = execution.run(missing) if len(missing) > 1 else {}
+    for job in computed.values():
+        if job.error is not None:
+            raise job.error
+    results = []
+    for name in names:
+        source_name, source_pipeline = _source(name)
+        if source_name in computed:
+            results.append(_view(name, computed[source_name].value))
+        else:
+            results.append(get_results(name))
+    return results
+
+
+def source_code(name):
+    """Renders a pipeline as the nannyml code it runs, for display next to a page's own source."""
+    pipeline = PIPELINES[name]
+    arguments = ''.join(f'    {key}={value!r},\n' for key, value in pipeline['kwargs'].items())
+    method = 'estimate' if hasattr(estimator_class(pipeline), 'estimate') else 'calculate'
+    lines = [f"reference_df, analysis_df, analysis_targets_df = load_dataset('{pipeline['dataset']}')"]
+    if pipeline.get('targets'):
+        lines.append('analysis_df = join_targets(analysis_df, analysis_targets_df)')
+    lines.append(f"estimator = nml.{pipeline['estimator']}(\n{arguments})")
+    lines.append('estimator.fit(reference_df)')
+    lines.append(f'results = estimator.{method}(analysis_df)')
+    if name in SHARED:
+        others = [other for other in SHARED[name][1]['members'] if other != name]
+        lines.insert(0, f"# calculated once together with {', '.join(others)}, for the union of their columns and "
+                        'methods, and filtered')
+    return '\n'.join(lines)
@@ -0,0 +1,163 @@
+"""Keeps the figures of pipeline results small, however many columns and chunks the results have.
+
+Per-column figures are built only for the columns a page shows. They are cached per results and column (bounded by
+``NML_FIGURE_CACHE_MB``) and shared between sessions, so reopening a column, or opening it in another session,
+doesn't build its figure again.
+
+Long histories of chunks can be limited to a window of analysis chunks selected by the user, and are downsampled to
+about ``NML_PLOT_MAX_POINTS`` chunks per figure (default 500), and as many for the reference chunks with a window, with
+the Largest-Triangle-Three-Buckets algorithm. Chunks raising an alert are always kept.
+"""
+import copy
+import math
+import os
+
+import numpy as np
+import streamlit as st
+
+from cache import LRUCache
+from data import chunk_column
+from pipelines import PIPELINES, inputs_key
+
+PAGE_SIZE = 10
+MAX_POINTS = int(os.environ.get('NML_PLOT_MAX_POINTS', 500))
+
+_cache = LRUCache(
+    max_bytes=int(os.environ.get('NML_FIGURE_CACHE_MB', 256)) * 1024 * 1024,
+    sizeof=lambda figure: len(figure.to_json()),
+)
+
+
+def _lttb(x, y, points):
+    # Positions of the ``points`` samples of (x, y) that best keep the shape of the line, see
+    # https://skemman.is/handle/1946/15343
+    if points >= len(x) or points < 3:
+        return np.arange(len(x))
+    bucket_size = (len(x) - 2) / (points - 2)
+    selected = [0]
+    for bucket in range(points - 2):
+        start, end = int(bucket * bucket_size) + 1, int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(x))
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        previous = selected[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        selected.append(start + int(np.argmax(areas)))
+    selected.append(len(x) - 1)
+    return np.array(selected)
+
+
+def _rows(results, rows):
+    limited = copy.copy(results)
+    limited.data = results.data.iloc[rows].reset_index(drop=True)
+    return limited
+
+
+def select_window(results, key):
+    """Lets the user pick a window of the analysis chunks of ``results`` to plot.
+
+    Returns the positions of its first and last chunk among the analysis chunks, or None for all of them.
+    """
+    data = results.data
+    analysis = data[data[chunk_column(data, 'period')] == 'analysis']
+    if len(analysis) < 2:
+        return None
+    start_dates = analysis[chunk_column(data, 'start_date')]
+    labels = (start_dates.astype(str) if start_dates.notna().all() else analysis[chunk_column(data, 'key')]).tolist()
+    window = st.select_slider(
+        'Analysis window', options=range(len(labels)), value=(0, len(labels) - 1),
+        format_func=lambda position: labels[position], key=key,
+    )
+    return None if window == (0, len(labels) - 1) else window
+
+
+def _downsample(rows, periods, series, max_points):
+    # The positions among ``rows`` kept to plot about ``max_points`` of them, see :func:`limit`.
+    if len(rows) <= max_points:
+        return rows
+    keep = {rows[0], rows[-1]}
+    for period in np.unique(periods[rows]):
+        in_period = rows[periods[rows] == period]
+        keep.update((in_period[0], in_period[-1]))
+    for results_data, column in series:
+        alert = column[:-1] + ('alert',)
+        if alert in results_data.columns:
+            keep.update(rows[results_data[alert].fillna(False).to_numpy(dtype=bool)[rows]])
+        values = results_data[column].to_numpy(dtype=float)[rows]
+        valid = np.flatnonzero(~np.isnan(values))
+        keep.update(rows[valid[_lttb(valid.astype(float), values[valid], max(3, max_points // len(series)))]])
+    return np.array(sorted(keep))
+
+
+def limit_all(results_list, window=None, max_points=MAX_POINTS):
+    """Returns :func:`limit` of each of ``results_list``, keeping the same chunks of each.
+
+    The results must have the same chunks, e.g. estimated and realized performance to compare.
+    """
+    data = results_list[0].data
+    periods = data[chunk_column(data, 'period')].to_numpy()
+    rows = np.arange(len(data))
+    series = [(results.data, c) for results in results_list for c in results.data.columns if c[-1] == 'value']
+    if window is None:
+        groups = [rows]
+    else:
+        # The window gets a budget of its own, so narrowing it shows all of its chunks however many reference chunks
+        # there are.
+        analysis = rows[periods == 'analysis']
+        groups = [rows[periods != 'analysis'], analysis[window[0]:window[1] + 1]]
+    rows = np.concatenate([_downsample(group, periods, series, max_points) for group in groups if len(group)])
+    if len(rows) == len(data):
+        return list(results_list)
+    return [_rows(results, rows) for results in results_list]
+
+
+def limit(results, window=None, max_points=MAX_POINTS):
+    """Returns ``results`` with only the reference chunks and the analysis chunks in ``window`` (see
+    :func:`select_window`), downsampled to about ``max_points`` chunks when there are more. With a window, the
+    reference chunks and the chunks in the window are downsampled to about ``max_points`` chunks each.
+
+    Every series of values is downsampled on its own and the union of the chunks they keep is returned, together with
+    the first and last chunk of each period and every chunk raising an alert.
+    """
+    return limit_all([results], window, max_points)[0]
+
+
+def column_figure(name, results, column_name, methods=None, kind=None, window=None):
+    """Returns ``limit(results.filter(column_names=[column_name], methods=methods), window).plot(kind=kind)``, built
+    once per results of pipeline ``name``, column and window.
+
+    Distribution figures of univariate drift results aren't limited: they are built from the chunks of the
+    underlying data rather than from the chunk rows of the results.
+    """
+    filter_kwargs = {'column_names': [column_name]}
+    if methods is not None:
+        filter_kwargs['methods'] = methods
+    if kind == 'distribution':
+        window = None
+
+    def build():
+        filtered = results.filter(**filter_kwargs)
+        if kind == 'distribution':
+            return filtered.plot(kind=kind)
+        return limit(filtered, window).plot(**({} if kind is None else {'kind': kind}))
+
+    key = (name, inputs_key(PIPELINES[name]), column_name, tuple(methods or ()), kind, window, MAX_POINTS)
+    return _cache.get_or_load(key, build)
+
+
+def select_columns(column_names, key, page_size=PAGE_SIZE):
+    """Lets the user pick the columns to plot, either by name or a page of ``page_size`` columns at a time.
+
+    Returns the picked columns, or the columns of the selected page when none are picked.
+    """
+    picked = st.multiselect('Columns', column_names, key=f'{key}_columns', placeholder='All columns, page by page')
+    if picked:
+        return picked
+    pages = math.ceil(len(column_names) / page_size)
+    page = st.number_input(f'Page (of {pages})', 1, pages, key=f'{key}_page') if pages > 1 else 1
+    return column_names[(page - 1) * page_size:page * page_size]
+
+
+def cache_stats():
+    return _cache.stats()
@@ -0,0 +1,37 @@
+"""Computes and stores the results of the page pipelines, so the app only reads them.
+
+Results are only recomputed when a pipeline configuration or its data changed, unless --force is given.
+
+    python precompute.py [--force] [pipeline ...]
+"""
+import argparse
+import time
+
+import store
+from pipelines import PIPELINES, _source, get_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pipelines', nargs='*', metavar='pipeline', help=f'defaults to all of: {", ".join(PIPELINES)}')
+    parser.add_argument('--force', action='store_true', help='recompute even when stored results are up to date')
+    args = parser.parse_args()
+    unknown = set(args.pipelines) - set(PIPELINES)
+    if unknown:
+        parser.error(f'unknown pipelines: {", ".join(sorted(unknown))}')
+
+    removed = set()
+    for name in args.pipelines or PIPELINES:
+        # Pipelines calculated together with others (see pipelines.SHARED) are stored under their shared name, which
+        # is only removed once so their shared results are only recomputed once.
+        source_name, _ = _source(name)
+        if args.force and source_name not in removed:
+            store.remove(source_name)
+            removed.add(source_name)
+        start = time.perf_counter()
+        get_results(name)
+        print(f'{name}: {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
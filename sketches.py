@@ -0,0 +1,238 @@
+"""Approximate univariate drift for very large chunks, calculated from sketches of the column distributions.
+
+Each column is summarized once per chunk, in a single vectorized pass over its values: continuous columns into a
+histogram over fixed bin edges taken from the reference data, categorical columns into counts per category.
+Sketches are mergeable, the sketch of several chunks being the sum of theirs, and drift statistics are calculated from
+them instead of from the raw values of every chunk:
+
+- ``kolmogorov_smirnov``: the largest difference between the reference and chunk distribution functions at the bin
+  edges. The edges are ``bins`` quantiles of the reference data, so the statistic is off by about ``1 / bins`` at
+  most for chunks distributed like the reference (default ``NML_SKETCH_BINS``, 1000).
+- ``jensen_shannon``: on the same bins as nannyml (the ``doane`` bin edges of the reference, or its values for
+  columns with few of them), which are part of the sketch edges, so it matches the exact calculator.
+- ``chi2``: on the counts per category, which match the exact calculator.
+
+Thresholds are derived from the reference chunks like nannyml does. Results don't keep the reference and analysis
+data, so they can't draw distribution plots.
+"""
+import os
+
+import nannyml as nml
+import numpy as np
+import pandas as pd
+from nannyml.base import _split_features_by_type
+from nannyml.drift.univariate.result import Result
+from nannyml.thresholds import calculate_threshold_values
+from scipy.spatial.distance import jensenshannon
+from scipy.stats import chi2_contingency
+
+BINS = int(os.environ.get('NML_SKETCH_BINS', 1000))
+
+CONTINUOUS_METHODS = ('kolmogorov_smirnov', 'jensen_shannon')
+CATEGORICAL_METHODS = ('chi2', 'jensen_shannon')
+
+# Threshold value limits of the nannyml methods.
+LIMITS = {'kolmogorov_smirnov': (0, 1), 'jensen_shannon': (0, None)}
+
+_ROW = '__sketch_row'
+
+
+def chunk_positions(chunker, df, timestamp_column_name):
+    """Returns the chunks of ``df`` (without their data) and the position of the chunk of each row, -1 for none."""
+    frame = pd.DataFrame({_ROW: np.arange(len(df))})
+    if timestamp_column_name:
+        frame[timestamp_column_name] = df[timestamp_column_name].to_numpy()
+    chunks = chunker.split(frame)
+    positions = np.full(len(df), -1)
+    for position, chunk in enumerate(chunks):
+        positions[chunk.data[_ROW].to_numpy()] = position
+        chunk.data = None
+    return chunks, positions
+
+
+def sketch(codes, positions, chunks, slots):
+    """Counts the ``codes`` (slots of 0 to ``slots - 1``) of the rows of each chunk, a ``chunks x slots`` array.
+
+    Rows with a negative chunk position or code aren't counted.
+    """
+    counted = (positions >= 0) & (codes >= 0)
+    flat = positions[counted] * slots + codes[counted]
+    return np.bincount(flat, minlength=chunks * slots).reshape(chunks, slots)
+
+
+def _bin_codes(values, edges):
+    # Slot 0 counts the values below the first edge and the last slot the ones above the last edge. Bins are
+    # half-open, except for the last one which includes its upper edge, like with np.histogram.
+    codes = np.searchsorted(edges, values, side='right')
+    codes[values == edges[-1]] = len(edges) - 1
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+class _Column:
+    """The sketches of a column in the reference and analysis chunks, and the reference data they need."""
+
+    def __init__(self, reference, analysis, continuous, bins):
+        reference_values = reference.dropna()
+        n_unique = reference_values.nunique()
+        self.continuous = continuous
+        # Like nannyml, Jensen-Shannon treats continuous columns with few values as categorical.
+        self.binned = continuous and (n_unique > 50 or n_unique / max(len(reference_values), 1) > 0.1)
+        if self.binned:
+            values = reference_values.to_numpy(dtype=float)
+            self.js_edges = np.histogram_bin_edges(values, bins='doane')
+            quantiles = np.quantile(values, np.linspace(0, 1, bins + 1))
+            self.edges = np.unique(np.concatenate([quantiles, self.js_edges]))
+            self.reference_codes = _bin_codes(reference.to_numpy(dtype=float), self.edges)
+            self.analysis_codes = _bin_codes(analysis.to_numpy(dtype=float), self.edges)
+            self.slots = len(self.edges) + 1
+        else:
+            categories = pd.Index(pd.unique(pd.concat([reference_values, analysis.dropna()], ignore_index=True)))
+            self.reference_codes = pd.Categorical(reference, categories=categories).codes.astype(np.int64)
+            self.analysis_codes = pd.Categorical(analysis, categories=categories).codes.astype(np.int64)
+            self.slots = len(categories)
+        if continuous and not self.binned:
+            # Kolmogorov-Smirnov still needs the values in order.
+            self.order = np.argsort(categories.to_numpy(dtype=float), kind='stable')
+        everywhere = np.zeros(len(reference), dtype=np.int64)
+        self.reference_total = sketch(self.reference_codes, everywhere, 1, self.slots)[0]
+
+
+def _ks(reference, chunks, order=None):
+    if order is not None:
+        reference, chunks = reference[order], chunks[:, order]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        reference_cdf = np.cumsum(reference) / reference.sum()
+        chunk_cdf = np.cumsum(chunks, axis=1) / chunks.sum(axis=1, keepdims=True)
+    return np.abs(chunk_cdf - reference_cdf).max(axis=1)
+
+
+def _js(column, reference, chunks):
+    if column.binned:
+        # Bins of nannyml, plus one for the values outside of them.
+        starts = np.searchsorted(column.edges, column.js_edges[:-1]) + 1
+        inside = slice(1, len(column.edges))
+        reference = np.append(np.add.reduceat(reference[inside], starts - 1), 0)
+        outside = chunks[:, 0] + chunks[:, -1]
+        chunks = np.column_stack([np.add.reduceat(chunks[:, inside], starts - 1, axis=1), outside])
+    else:
+        # Reference categories, plus one for the categories the reference doesn't have.
+        seen = reference > 0
+        reference = np.append(reference[seen], 0)
+        chunks = np.column_stack([chunks[:, seen], chunks[:, ~seen].sum(axis=1)])
+    values = np.full(len(chunks), np.nan)
+    counted = chunks.sum(axis=1) > 0
+    if counted.any():
+        counted_chunks = chunks[counted]
+        values[counted] = jensenshannon(
+            np.broadcast_to(reference, counted_chunks.shape), counted_chunks, base=2, axis=1
+        )
+    return values
+
+
+def _chi2(reference, chunks):
+    values, alerts = np.full(len(chunks), np.nan), np.zeros(len(chunks), dtype=bool)
+    for position, counts in enumerate(chunks):
+        if counts.sum() == 0:
+            continue
+        present = (reference > 0) | (counts > 0)
+        statistic, p_value, _, _ = chi2_contingency(np.column_stack([reference[present], counts[present]]))
+        values[position], alerts[position] = statistic, p_value < 0.05
+    return values, alerts
+
+
+def _statistic(method, column, chunks):
+    if method == 'kolmogorov_smirnov':
+        return _ks(column.reference_total, chunks, getattr(column, 'order', None))
+    if method == 'jensen_shannon':
+        return _js(column, column.reference_total, chunks)
+    return _chi2(column.reference_total, chunks)[0]
+
+
+def chunk_rows(chunks, period):
+    """Returns the chunk columns of results (key, indices, dates and period), one row per chunk."""
+    return pd.DataFrame({
+        'key': [chunk.key for chunk in chunks],
+        'chunk_index': [chunk.chunk_index for chunk in chunks],
+        'start_index': [chunk.start_index for chunk in chunks],
+        'end_index': [chunk.end_index for chunk in chunks],
+        'start_date': [chunk.start_datetime for chunk in chunks],
+        'end_date': [chunk.end_datetime for chunk in chunks],
+        'period': period,
+    })
+
+
+def calculate_univariate_drift(reference_df, analysis_df, column_names, bins=None, **kwargs):
+    """Calculates the results of ``nml.UnivariateDriftCalculator(column_names=column_names, **kwargs)`` from sketches
+    of the column distributions, with ``bins`` bins per continuous column (default ``NML_SKETCH_BINS``).
+
+    Supports the ``kolmogorov_smirnov``, ``jensen_shannon`` and ``chi2`` methods. The result can be filtered, plotted
+    (except distribution plots) and ranked like the calculator's.
+    """
+    calculator = nml.UnivariateDriftCalculator(column_names=column_names, **kwargs)
+    unsupported = (set(calculator.continuous_method_names) - set(CONTINUOUS_METHODS)) | (
+        set(calculator.categorical_method_names) - set(CATEGORICAL_METHODS))
+    if unsupported:
+        raise ValueError(f'sketches do not support the {", ".join(sorted(unsupported))} methods')
+
+    continuous, categorical = _split_features_by_type(reference_df, column_names)
+    for column_name in calculator.treat_as_categorical:
+        if column_name in continuous:
+            continuous.remove(column_name)
+            categorical.append(column_name)
+
+    timestamp_column_name = calculator.timestamp_column_name
+    reference_chunks, reference_positions = chunk_positions(calculator.chunker, reference_df, timestamp_column_name)
+    analysis_chunks, analysis_positions = chunk_positions(calculator.chunker, analysis_df, timestamp_column_name)
+    data = {('chunk', 'chunk', name): values for name, values in pd.concat(
+        [chunk_rows(reference_chunks, 'reference'), chunk_rows(analysis_chunks, 'analysis')], ignore_index=True
+    ).items()}
+
+    for column_names_of_type, methods in ((continuous, calculator.continuous_method_names),
+                                          (categorical, calculator.categorical_method_names)):
+        for column_name in column_names_of_type:
+            column = _Column(
+                reference_df[column_name], analysis_df[column_name], column_name in continuous, bins or BINS
+            )
+            reference_sketches = sketch(column.reference_codes, reference_positions, len(reference_chunks),
+                                        column.slots)
+            analysis_sketches = sketch(column.analysis_codes, analysis_positions, len(analysis_chunks), column.slots)
+            for method in methods:
+                if method == 'chi2':
+                    # Alerts on p-values, without thresholds.
+                    values, alerts = _chi2(column.reference_total, np.vstack([reference_sketches, analysis_sketches]))
+                    lower, upper = None, None
+                else:
+                    reference_values = _statistic(method, column, reference_sketches)
+                    lower_limit, upper_limit = LIMITS[method]
+                    lower, upper = calculate_threshold_values(
+                        calculator.thresholds[method], reference_values[~np.isnan(reference_values)],
+                        lower_threshold_value_limit=lower_limit, upper_threshold_value_limit=upper_limit,
+                    )
+                    values = np.concatenate([reference_values, _statistic(method, column, analysis_sketches)])
+                    alerts = np.zeros(len(values), dtype=bool)
+                    with np.errstate(invalid='ignore'):
+                        if lower is not None:
+                            alerts |= values < lower
+                        if upper is not None:
+                            alerts |= values > upper
+                data[(column_name, method, 'value')] = values
+                data[(column_name, method, 'upper_threshold')] = upper
+                data[(column_name, method, 'lower_threshold')] = lower
+                data[(column_name, method, 'alert')] = alerts
+
+    result = Result(
+        results_data=pd.DataFrame(data),
+        column_names=column_names,
+        continuous_column_names=continuous,
+        categorical_column_names=categorical,
+        continuous_method_names=calculator.continuous_method_names,
+        categorical_method_names=calculator.categorical_method_names,
+        timestamp_column_name=timestamp_column_name,
+        chunker=calculator.chunker,
+    )
+    # Orders the columns like the calculator's results, which are filtered when calculating.
+    result = result.filter(period='all')
+    result.reference_data = None
+    result.analysis_data = None
+    return result
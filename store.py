@@ -0,0 +1,177 @@
+import contextlib
+import fcntl
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from export import FRAMES, read_frame, split, write_frame
+
+ROOT = os.environ.get('NML_RESULTS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results'))
+MANIFEST = 'manifest.json'
+# Compression of the stored frames, zstd, lz4 or none. Uncompressed frames are loaded without copying them in memory.
+COMPRESSION = os.environ.get('NML_RESULTS_COMPRESSION', 'none')
+COMPRESSION = None if COMPRESSION == 'none' else COMPRESSION
+
+_lock = threading.Lock()
+
+
+def _write_atomic(path, write):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=directory, suffix='.tmp', delete=False) as f:
+        write(f)
+    os.replace(f.name, path)
+
+
+def manifest():
+    """Returns ``{name: entry}`` for every stored result, where ``key`` identifies the inputs it was computed from."""
+    path = os.path.join(ROOT, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+@contextlib.contextmanager
+def _file_lock(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def _manifest_lock():
+    # Results may be saved by several worker processes at once, see execution.py.
+    with _lock, _file_lock(os.path.join(ROOT, 'manifest.lock')):
+        yield
+
+
+def lock(name):
+    """Returns a context manager holding an exclusive lock on ``name`` across threads and processes, for updates that
+    read a stored result before changing it."""
+    return _file_lock(os.path.join(ROOT, f'{name}.lock'))
+
+
+def _update_manifest(name, entry):
+    with _manifest_lock():
+        entries = manifest()
+        if entry is None:
+            entries.pop(name, None)
+        else:
+            entries[name] = entry
+        _write_atomic(
+            os.path.join(ROOT, MANIFEST),
+            lambda f: f.write(json.dumps(entries, indent=2, sort_keys=True).encode()),
+        )
+
+
+def _directory(name, key):
+    return os.path.join(ROOT, name, key)
+
+
+def _write_frame(path, df):
+    _write_atomic(path, lambda f: write_frame(df, f, COMPRESSION))
+
+
+def _read_frame(path):
+    return pd.read_parquet(path) if path.endswith('.parquet') else read_frame(path)
+
+
+def save(name, key, result, **metadata):
+    """Stores a result object in the files of export.py: its chunk rows and other frames as Arrow IPC files, which are
+    memory-mapped when loaded, and everything else (metrics, column names, ...) pickled.
+
+    ``metadata`` is added to the manifest entry of the result.
+    """
+    directory = _directory(name, key)
+    os.makedirs(directory, exist_ok=True)
+
+    shell, frames = split(result)
+    _write_atomic(os.path.join(directory, 'result.pkl'), lambda f: pickle.dump(shell, f, protocol=pickle.HIGHEST_PROTOCOL))
+    for frame_name, frame in frames.items():
+        if frame_name != 'data':
+            _write_frame(os.path.join(directory, f'{frame_name}.arrow'), frame)
+
+    part = 'part-00000.arrow'
+    _write_frame(os.path.join(directory, part), result.data)
+
+    previous = manifest().get(name)
+    _update_manifest(name, {
+        'key': key,
+        'result_type': f'{type(result).__module__}.{type(result).__qualname__}',
+        'parts': [part],
+        'rows': len(result.data),
+        'saved_at': time.time(),
+        **metadata,
+    })
+    if previous and previous['key'] != key:
+        shutil.rmtree(_directory(name, previous['key']), ignore_errors=True)
+
+
+def append(name, data, **metadata):
+    """Adds chunk rows to a stored result as a new part, leaving the existing parts untouched.
+
+    ``metadata`` updates the manifest entry of the result together with its parts.
+    """
+    entry = manifest()[name]
+    part = f'part-{len(entry["parts"]):05d}.arrow'
+    _write_frame(os.path.join(_directory(name, entry['key']), part), data)
+    entry = dict(entry, parts=entry['parts'] + [part], rows=entry['rows'] + len(data), saved_at=time.time(), **metadata)
+    _update_manifest(name, entry)
+
+
+def path(name, key, filename):
+    """Returns the path of an extra file kept next to a stored result."""
+    return os.path.join(_directory(name, key), filename)
+
+
+def write_file(name, key, filename, write):
+    """Writes an extra file kept next to a stored result with ``write(f)``, replacing any previous file atomically."""
+    _write_atomic(path(name, key, filename), write)
+
+
+def load(name, key=None):
+    """Returns the stored result of ``name``, or None when nothing is stored or it was computed from other inputs."""
+    entry = manifest().get(name)
+    if entry is None or (key is not None and entry['key'] != key):
+        return None
+
+    directory = _directory(name, entry['key'])
+    try:
+        with open(os.path.join(directory, 'result.pkl'), 'rb') as f:
+            result = pickle.load(f)
+        # Results stored before the Arrow IPC files have Parquet parts.
+        parts = [_read_frame(os.path.join(directory, part)) for part in entry['parts']]
+        for frame_name in FRAMES:
+            frame_path = os.path.join(directory, f'{frame_name}.arrow')
+            if frame_name != 'data' and os.path.exists(frame_path):
+                setattr(result, frame_name, _read_frame(frame_path))
+    except FileNotFoundError:
+        return None
+    except (pickle.UnpicklingError, AttributeError, ModuleNotFoundError):
+        # Pickled by versions of nannyml or pandas whose classes changed since: computed again.
+        return None
+    result.data = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    return result
+
+
+def keys(name):
+    """Returns the keys of the files kept for ``name``, including extra files of results that aren't stored yet."""
+    directory = os.path.join(ROOT, name)
+    return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+
+def remove(name):
+    if name in manifest():
+        _update_manifest(name, None)
+    shutil.rmtree(os.path.join(ROOT, name), ignore_errors=True)
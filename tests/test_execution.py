@@ -0,0 +1,18 @@
+import threading
+
+import execution
+
+
+def _unpicklable():
+    return threading.Lock()
+
+
+def test_job_result_failing_to_pickle_only_fails_its_job(monkeypatch):
+    monkeypatch.setenv('NML_WORKERS', '2')
+    execution.shutdown()
+    try:
+        results = execution.run({'fails': (_unpicklable,), 'succeeds': (sum, [1, 2])})
+    finally:
+        execution.shutdown()
+    assert results['fails'].value is None and isinstance(results['fails'].error, Exception)
+    assert results['succeeds'].value == 3 and results['succeeds'].error is None
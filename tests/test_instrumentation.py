@@ -0,0 +1,34 @@
+import json
+import os
+from collections import Counter
+
+from streamlit.testing.v1 import AppTest
+
+import execution
+import store
+import warmup
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_parallel_page_logs_each_stage_once(tmp_path, monkeypatch):
+    log = tmp_path / 'stages.jsonl'
+    monkeypatch.setenv('NML_STAGE_LOG', str(log))
+    monkeypatch.setenv('NML_WORKERS', '2')
+    # Workers read the results directory from the environment when they start.
+    monkeypatch.setenv('NML_RESULTS_DIR', str(tmp_path / 'results'))
+    monkeypatch.setattr(store, 'ROOT', str(tmp_path / 'results'))
+    monkeypatch.setattr(warmup, 'ENABLED', False)
+    execution.shutdown()
+    try:
+        app = AppTest.from_file(os.path.join(ROOT, 'pages', '3_Monitoring_Realized_Performance_Classification.py'))
+        app.run(timeout=600)
+    finally:
+        execution.shutdown()
+    assert not app.exception
+
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    logged = Counter(json.dumps(record, sort_keys=True) for record in records)
+    assert max(logged.values()) == 1
+    pipelines = Counter(record['labels']['pipeline'] for record in records if record['stage'] == 'pipeline')
+    assert len(pipelines) > 1 and set(pipelines.values()) == {1}
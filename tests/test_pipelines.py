@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+import pipelines
+
+DRIFT_KWARGS = {'timestamp_column_name': 'timestamp', 'chunk_size': 5000}
+
+
+@pytest.fixture
+def drift_pipelines(monkeypatch):
+    monkeypatch.setenv('NML_WORKERS', '1')
+    # Shared for the union of their methods, in another order than the methods of ``methods_differ``.
+    candidates = {
+        'union_order': {
+            'dataset': 'car_loan',
+            'estimator': 'UnivariateDriftCalculator',
+            'kwargs': dict(
+                DRIFT_KWARGS,
+                column_names=['car_value', 'salary_range', 'debt_to_income_ratio'],
+                continuous_methods=['kolmogorov_smirnov', 'jensen_shannon'],
+                categorical_methods=['jensen_shannon'],
+            ),
+        },
+        'methods_differ': {
+            'dataset': 'car_loan',
+            'estimator': 'UnivariateDriftCalculator',
+            'kwargs': dict(
+                DRIFT_KWARGS,
+                column_names=['salary_range', 'car_value'],
+                continuous_methods=['jensen_shannon'],
+                categorical_methods=['chi2', 'jensen_shannon'],
+            ),
+        },
+    }
+    shared = pipelines._shared_drift_pipelines(candidates)
+    monkeypatch.setattr(pipelines, 'PIPELINES', candidates)
+    monkeypatch.setattr(pipelines, 'SHARED', shared)
+    return shared
+
+
+@pytest.mark.parametrize('name', ['union_order', 'methods_differ'])
+def test_shared_drift_view_matches_own_calculator(drift_pipelines, name):
+    shared_name, shared_pipeline = drift_pipelines[name]
+    pipeline = pipelines.PIPELINES[name]
+
+    view = pipelines._view(name, pipelines.compute(shared_pipeline, *pipelines.load_data(shared_pipeline)))
+    expected = pipelines.compute(pipeline, *pipelines.load_data(pipeline))
+
+    assert list(view.data.columns) == list(expected.data.columns)
+    assert view.column_names == expected.column_names
+    assert view.continuous_method_names == expected.continuous_method_names
+    assert view.categorical_method_names == expected.categorical_method_names
+    pd.testing.assert_frame_equal(view.to_df(), expected.to_df())
@@ -2,11 +2,44 @@ import inspect
 import os
 import streamlit as st
 
+import instrumentation
+import warmup
+
+
+def _page(frame):
+    return os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+
+
+def stage(name):
+    """Records a stage of the calling page, see :mod:`instrumentation`."""
+    return instrumentation.stage(name, page=_page(inspect.currentframe().f_back))
+
+
+def warmup_status():
+    """Starts the warm-up of the app (see :mod:`warmup`) and tells the user when the results of the calling page are
+    still being computed by it."""
+    from pipelines import PIPELINES
+
+    warmup.start()
+    page = _page(inspect.currentframe().f_back)
+    warming = warmup.warming(*[name for name, pipeline in PIPELINES.items() if pipeline['page'] == page])
+    if warming:
+        st.info(f'The results of this page ({", ".join(warming)}) are still being computed in the background since '
+                'the server started. They are shown as soon as they are ready.')
+
+
+def display_source_code(*pipeline_names):
+    instrumentation.sidebar_panel()
 
-def display_source_code():
     st.write("---")
     st.header('Source code')
     caller_path = os.path.abspath((inspect.stack()[1])[1])
     with open(caller_path, 'r') as f:
         code = ''.join(f.readlines()[:-2]) # ignore two last lines
     st.code(code, language='python')
+
+    if pipeline_names:
+        from pipelines import source_code
+        st.subheader('Pipelines')
+        for name in pipeline_names:
+            st.code(source_code(name), language='python')
@@ -0,0 +1,81 @@
+"""Warms up the app when the Streamlit server starts: loads the datasets and computes the results of every page's
+pipeline in the background, so the first users of a page don't wait for its estimators to be fitted.
+
+The warm-up starts with the first script run of the server (the home page or any page), loads the datasets in a
+background thread and computes the pipelines missing from the results store in worker processes (see execution.py),
+the slowest pages first. Pages asking for a pipeline that is still warming up wait for it instead of computing it a
+second time, and can show :func:`status` meanwhile. Set ``NML_WARMUP=0`` to disable it.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import execution
+from data import load_dataset
+from instrumentation import stage
+from pipelines import PIPELINES, get_results_in_worker
+
+ENABLED = os.environ.get('NML_WARMUP', '1') != '0'
+
+# Pipelines fitting models, warmed up first.
+SLOW_ESTIMATORS = ('DLE', 'CBPE', 'DataReconstructionDriftCalculator', 'UnivariateDriftCalculator')
+
+_status = {}
+_lock = threading.Lock()
+_thread = None
+
+
+def _set(name, state, **details):
+    with _lock:
+        _status[name] = dict(_status.get(name, {}), state=state, **details)
+
+
+def _warm_pipeline(name):
+    _set(name, 'running', started_at=time.time())
+    start = time.perf_counter()
+    try:
+        with stage('warmup', pipeline=name):
+            get_results_in_worker(name)
+    except Exception as exc:
+        _set(name, 'failed', seconds=time.perf_counter() - start, error=repr(exc))
+    else:
+        _set(name, 'ready', seconds=time.perf_counter() - start)
+
+
+def _warm_up(names):
+    datasets = sorted({PIPELINES[name]['dataset'] for name in names})
+    for dataset in datasets:
+        try:
+            with stage('warmup', dataset=dataset):
+                load_dataset(dataset)
+        except Exception:
+            # The pipelines of the dataset fail too, and record the error.
+            pass
+    with ThreadPoolExecutor(max_workers=execution.max_workers(), thread_name_prefix='warmup') as pool:
+        list(pool.map(_warm_pipeline, names))
+
+
+def start():
+    """Starts warming up every pipeline in a background thread, unless it is disabled or already started."""
+    global _thread
+    with _lock:
+        if not ENABLED or _thread is not None:
+            return
+        names = sorted(PIPELINES, key=lambda name: PIPELINES[name]['estimator'] not in SLOW_ESTIMATORS)
+        for name in names:
+            _status[name] = {'state': 'waiting'}
+        _thread = threading.Thread(target=_warm_up, args=(names,), name='warmup', daemon=True)
+        _thread.start()
+
+
+def status():
+    """Returns ``{pipeline: {'state', ...}}``, where the state is one of waiting, running, ready or failed."""
+    with _lock:
+        return {name: dict(entry) for name, entry in _status.items()}
+
+
+def warming(*names):
+    """Returns the pipelines among ``names`` whose warm-up hasn't finished yet."""
+    states = status()
+    return [name for name in names if states.get(name, {}).get('state') in ('waiting', 'running')]